@@ -5,9 +5,22 @@ Command-line interface for the code smell detector.
 import argparse
 import sys
 import os
-from pathlib import Path
-from typing import List, Optional
-from .smell_detector import CodeSmellDetector
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict
+from typing import Any, Dict, List, Optional, TextIO
+from . import __version__
+from .smell_detector import CodeSmell, CodeSmellDetector
+
+
+# Below this many files, starting worker processes costs more than it saves
+PARALLEL_MIN_FILES = 8
+
+# Results of the last --incremental run, stored in the working directory
+MANIFEST_FILE = '.code-smell-cache.json'
+
+# Per-process state set up by _init_worker
+_worker_detector = None
+_worker_filters = (None, None)
 
 
 def main():
@@ -65,6 +78,18 @@ Examples:
         help='Output format (default: text)'
     )
     
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='Do not reuse or store parsed files in the cache directory'
+    )
+    
+    parser.add_argument(
+        '--incremental',
+        action='store_true',
+        help=f'Reuse results for files unchanged since the last run (stored in {MANIFEST_FILE})'
+    )
+    
     args = parser.parse_args()
     
     # Parse only and exclude options
@@ -72,7 +97,7 @@ Examples:
     exclude = args.exclude.split(',') if args.exclude else None
     
     # Initialize detector
-    detector = CodeSmellDetector(args.config)
+    detector = CodeSmellDetector(args.config, use_cache=not args.no_cache)
     
     # Find Python files to analyze
     python_files = find_python_files(args.target)
@@ -81,35 +106,70 @@ Examples:
         print(f"No Python files found in {args.target}")
         sys.exit(1)
     
+    # Reuse results for files unchanged since the last incremental run
+    settings = _manifest_settings(args.config, only, exclude)
+    manifest = load_manifest(settings) if args.incremental else {}
+    file_stats = {}
+    if args.incremental:
+        for file_path in python_files:
+            try:
+                file_stats[file_path] = _file_stat(file_path)
+            except OSError:
+                # Unreadable files are analyzed again and reported as errors
+                pass
+    results = {}
+    pending = []
+    for file_path in python_files:
+        entry = manifest.get(os.path.abspath(file_path))
+        if entry is not None and entry['stat'] == file_stats.get(file_path):
+            results[file_path] = [CodeSmell(**smell) for smell in entry['smells']]
+        else:
+            pending.append(file_path)
+    
     if args.verbose:
-        print(f"Analyzing {len(python_files)} Python files...")
+        print(f"Analyzing {len(pending)} Python files...")
+        if results:
+            print(f"Reusing results for {len(results)} unchanged files")
     
     # Analyze each file
-    all_smells = []
-    for file_path in python_files:
-        if args.verbose:
-            print(f"Analyzing {file_path}...")
-        
-        smells = detector.detect_smells(file_path, only, exclude)
-        all_smells.extend(smells)
-    
-    # Generate report
-    if args.format == 'text':
-        report = detector.generate_report()
-    elif args.format == 'json':
-        report = generate_json_report(all_smells)
-    elif args.format == 'csv':
-        report = generate_csv_report(all_smells)
+    if len(pending) < PARALLEL_MIN_FILES:
+        for file_path in pending:
+            if args.verbose:
+                print(f"Analyzing {file_path}...")
+            
+            results[file_path] = detector.detect_smells(file_path, only, exclude)
     else:
-        report = detector.generate_report()
+        # Files are independent, so spread them over worker processes
+        chunksize = max(1, len(pending) // ((os.cpu_count() or 1) * 4))
+        with ProcessPoolExecutor(initializer=_init_worker,
+                                 initargs=(args.config, not args.no_cache, only, exclude)) as executor:
+            smell_lists = executor.map(_analyze_one, pending, chunksize=chunksize)
+            for file_path, smells in zip(pending, smell_lists):
+                if args.verbose:
+                    print(f"Analyzed {file_path}")
+                results[file_path] = smells
     
-    # Output report
+    if args.incremental:
+        save_manifest(settings, {
+            os.path.abspath(file_path): {
+                'stat': file_stats[file_path],
+                'smells': [asdict(smell) for smell in results[file_path]]
+            }
+            for file_path in python_files if file_path in file_stats
+        })
+    
+    all_smells = [smell for file_path in python_files for smell in results[file_path]]
+    
+    # Report on every file, not just the last one analyzed
+    detector.smells = all_smells
+    
+    # Write report straight to its destination
     if args.output:
         with open(args.output, 'w') as f:
-            f.write(report)
+            write_report(detector, all_smells, args.format, f)
         print(f"Report saved to {args.output}")
     else:
-        print(report)
+        write_report(detector, all_smells, args.format, sys.stdout)
     
     # Exit with appropriate code
     if all_smells:
@@ -122,66 +182,124 @@ Examples:
         sys.exit(0)  # No smells found
 
 
+def _init_worker(config_path: Optional[str], use_cache: bool,
+                 only: Optional[List[str]], exclude: Optional[List[str]]):
+    """Create the detector used by _analyze_one in a worker process."""
+    global _worker_detector, _worker_filters
+    _worker_detector = CodeSmellDetector(config_path, use_cache=use_cache)
+    _worker_filters = (only, exclude)
+
+
+def _analyze_one(file_path: str) -> List:
+    """Analyze a single file in a worker process."""
+    only, exclude = _worker_filters
+    return _worker_detector.detect_smells(file_path, only, exclude)
+
+
+def _file_stat(path: str) -> List[int]:
+    """Return the (mtime_ns, size) pair used to spot changed files."""
+    st = os.stat(path)
+    return [st.st_mtime_ns, st.st_size]
+
+
+def _manifest_settings(config_path: Optional[str], only: Optional[List[str]],
+                       exclude: Optional[List[str]]) -> List[Any]:
+    """Describe everything besides file contents that affects the results."""
+    config_stat = None
+    if config_path and os.path.exists(config_path):
+        config_stat = _file_stat(config_path)
+        config_path = os.path.abspath(config_path)
+    return [__version__, config_path, config_stat, only, exclude]
+
+
+def load_manifest(settings: List[Any]) -> Dict[str, Dict[str, Any]]:
+    """Load per-file results from the last incremental run with the same settings."""
+    import json
+    
+    try:
+        with open(MANIFEST_FILE, 'r') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    
+    if manifest.get('settings') != settings:
+        return {}
+    return manifest.get('files', {})
+
+
+def save_manifest(settings: List[Any], files: Dict[str, Dict[str, Any]]):
+    """Store per-file results for the next incremental run."""
+    import json
+    
+    try:
+        with open(MANIFEST_FILE, 'w') as f:
+            json.dump({'settings': settings, 'files': files}, f)
+    except OSError as e:
+        print(f"Warning: Could not write {MANIFEST_FILE}: {e}")
+
+
 def find_python_files(target: str) -> List[str]:
     """Find all Python files in the target path."""
     python_files = []
-    target_path = Path(target)
     
-    if target_path.is_file():
-        if target_path.suffix == '.py':
-            python_files.append(str(target_path))
-    elif target_path.is_dir():
-        for py_file in target_path.rglob('*.py'):
-            python_files.append(str(py_file))
+    if os.path.isfile(target):
+        if target.endswith('.py'):
+            python_files.append(target)
+    elif os.path.isdir(target):
+        for root, dirs, files in os.walk(target):
+            # Skip hidden directories and bytecode caches entirely
+            dirs[:] = [d for d in dirs if not d.startswith('.') and d != '__pycache__']
+            python_files.extend(os.path.join(root, f) for f in files if f.endswith('.py'))
     
     return sorted(python_files)
 
 
-def generate_json_report(smells: List) -> str:
-    """Generate JSON format report."""
+def write_report(detector: CodeSmellDetector, smells: List, report_format: str, fp: TextIO):
+    """Write the report in the requested format to a file-like object."""
+    if report_format == 'json':
+        generate_json_report(smells, fp)
+    elif report_format == 'csv':
+        generate_csv_report(smells, fp)
+    else:
+        fp.writelines(line + '\n' for line in detector.iter_report_lines())
+
+
+def generate_json_report(smells: List, fp: TextIO):
+    """Generate JSON format report, writing one smell at a time."""
     import json
     
-    report_data = {
-        'total_smells': len(smells),
-        'smells': []
-    }
+    fp.write(f'{{\n  "total_smells": {len(smells)},\n  "smells": [')
     
-    for smell in smells:
-        report_data['smells'].append({
+    for i, smell in enumerate(smells):
+        smell_json = json.dumps({
             'type': smell.smell_type,
             'file': smell.file_path,
             'line': smell.line_number,
             'description': smell.description,
             'severity': smell.severity,
             'suggestion': smell.suggestion
-        })
+        }, indent=2)
+        fp.write(',\n    ' if i else '\n    ')
+        fp.write(smell_json.replace('\n', '\n    '))
     
-    return json.dumps(report_data, indent=2)
+    fp.write('\n  ]\n}\n' if smells else ']\n}\n')
 
 
-def generate_csv_report(smells: List) -> str:
+def generate_csv_report(smells: List, fp: TextIO):
     """Generate CSV format report."""
     import csv
-    import io
     
-    output = io.StringIO()
-    writer = csv.writer(output)
+    writer = csv.writer(fp)
     
     # Write header
     writer.writerow(['Type', 'File', 'Line', 'Description', 'Severity', 'Suggestion'])
     
     # Write data
-    for smell in smells:
-        writer.writerow([
-            smell.smell_type,
-            smell.file_path,
-            smell.line_number,
-            smell.description,
-            smell.severity,
-            smell.suggestion
-        ])
-    
-    return output.getvalue()
+    writer.writerows(
+        [smell.smell_type, smell.file_path, smell.line_number,
+         smell.description, smell.severity, smell.suggestion]
+        for smell in smells
+    )
 
 
 if __name__ == '__main__':
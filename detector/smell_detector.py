@@ -1,9 +1,58 @@
 import ast
+import functools
+import hashlib
+import pickle
 import re
+import sys
+import time
 import yaml
 import os
-from typing import List, Dict, Any, Tuple, Optional
+from pathlib import Path
+from array import array
+from collections import defaultdict
+from types import MappingProxyType
+from typing import List, Dict, Any, Tuple, Optional, FrozenSet, Mapping, Iterator
 from dataclasses import dataclass
+from importlib.util import decode_source
+
+# Prefer the libyaml-backed loader when PyYAML was built with it
+try:
+    from yaml import CSafeLoader as _YamlLoader
+except ImportError:
+    from yaml import SafeLoader as _YamlLoader
+
+
+# Strings, comments, words and single punctuation characters
+_TOKEN_RE = re.compile(r"""'(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*"|#.*|\w+|[^\w\s]""")
+
+# Parsed trees are cached here between runs
+CACHE_DIR = Path(os.environ.get('XDG_CACHE_HOME', os.path.expanduser('~/.cache'))) / 'code-smell-detector'
+_CACHE_FORMAT = 2
+
+# Cache entries not rewritten for this many seconds are deleted, which also
+# clears out entries for files that were deleted or moved
+CACHE_MAX_AGE = 30 * 24 * 60 * 60
+
+# Detector names in reporting order
+ALL_DETECTORS = ('long_method', 'god_class', 'duplicated_code',
+                 'large_parameter_list', 'magic_numbers', 'feature_envy')
+
+# Detectors that need to see expressions, not just definitions
+_EXPRESSION_DETECTORS = frozenset({'magic_numbers', 'feature_envy'})
+
+# Definitions, and the statement nodes whose bodies can contain them;
+# AST node classes are never subclassed, so definitions are matched by exact type
+_DEF_TYPES = frozenset({ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef})
+_BLOCK_TYPES = (ast.stmt, ast.excepthandler) + ((ast.match_case,) if hasattr(ast, 'match_case') else ())
+
+# Numeric literals too common to be reported as magic numbers; equal floats
+# (0.0, 1.0, ...) hash the same and are matched too
+_MAGIC_NUMBER_SKIP = frozenset({0, 1, -1, 2, 10, 100, 1000})
+
+# Polynomial rolling hash parameters for duplicated code detection;
+# arithmetic wraps at 64 bits
+_HASH_BASE = 1000003
+_HASH_MASK = (1 << 64) - 1
 
 
 @dataclass
@@ -17,62 +66,284 @@ class CodeSmell:
     suggestion: str = ""
 
 
+@functools.lru_cache(maxsize=8)
+def _load_config_cached(config_path: Optional[str], mtime_ns: int) -> Mapping[str, Mapping[str, Any]]:
+    """Load configuration from YAML file, cached per path and mtime."""
+    default_config = {
+        'long_method': {
+            'enabled': True,
+            'max_lines': 20,
+            'severity': 'high'
+        },
+        'god_class': {
+            'enabled': True,
+            'max_methods': 10,
+            'max_attributes': 15,
+            'severity': 'high'
+        },
+        'duplicated_code': {
+            'enabled': True,
+            'min_similarity': 0.8,
+            'min_lines': 5,
+            'severity': 'medium'
+        },
+        'large_parameter_list': {
+            'enabled': True,
+            'max_parameters': 5,
+            'severity': 'medium'
+        },
+        'magic_numbers': {
+            'enabled': True,
+            'severity': 'low'
+        },
+        'feature_envy': {
+            'enabled': True,
+            'max_external_calls': 3,
+            'severity': 'medium'
+        }
+    }
+    
+    if config_path and os.path.exists(config_path):
+        try:
+            with open(config_path, 'rb') as f:
+                user_config = yaml.load(f, Loader=_YamlLoader)
+                # Merge user config with defaults
+                for key, value in user_config.items():
+                    if key in default_config:
+                        default_config[key].update(value)
+        except Exception as e:
+            print(f"Warning: Could not load config file {config_path}: {e}")
+    
+    # The cached result is shared between detectors, so hand out read-only views
+    return MappingProxyType({key: MappingProxyType(value) for key, value in default_config.items()})
+
+
+def _window_hashes(line_hashes: array, window: int) -> List[int]:
+    """Rolling hash of every run of `window` consecutive line hashes."""
+    drop_factor = pow(_HASH_BASE, window, 1 << 64)
+    hashes = []
+    window_hash = 0
+    for i, line_hash in enumerate(line_hashes):
+        window_hash = (window_hash * _HASH_BASE + line_hash) & _HASH_MASK
+        if i >= window:
+            window_hash = (window_hash - line_hashes[i - window] * drop_factor) & _HASH_MASK
+        if i >= window - 1:
+            hashes.append(window_hash)
+    return hashes
+
+
+@functools.lru_cache(maxsize=None)
+def _prune_cache(cache_dir: Path):
+    """Delete expired cache entries and leftover temporary files, once per process."""
+    cutoff = time.time() - CACHE_MAX_AGE
+    for entry in cache_dir.iterdir():
+        try:
+            if entry.suffix in ('.pkl', '.tmp') and entry.stat().st_mtime < cutoff:
+                entry.unlink()
+        except OSError:
+            pass
+
+
+def _iter_defs(node: ast.AST):
+    """Yield the definitions directly nested in node's statement blocks."""
+    for child in ast.iter_child_nodes(node):
+        if type(child) in _DEF_TYPES:
+            yield child
+        elif isinstance(child, _BLOCK_TYPES):
+            yield from _iter_defs(child)
+
+
+class _SmellVisitor(ast.NodeVisitor):
+    """Single-pass AST visitor that runs all node-based detectors."""
+    
+    def __init__(self, config: Mapping[str, Mapping[str, Any]], enabled: FrozenSet[str], file_path: str):
+        """Initialize the visitor with configuration and enabled detectors."""
+        self.config = config
+        self.enabled = enabled
+        self.file_path = file_path
+        self.smells = {name: [] for name in enabled}
+        
+        # Read thresholds once instead of on every node
+        self._max_lines = config['long_method']['max_lines']
+        self._max_methods = config['god_class']['max_methods']
+        self._max_attributes = config['god_class']['max_attributes']
+        self._max_parameters = config['large_parameter_list']['max_parameters']
+        self._max_external_calls = config['feature_envy']['max_external_calls']
+        self._severities = {name: config[name]['severity'] for name in ALL_DETECTORS}
+        self._check_magic_numbers = 'magic_numbers' in enabled
+        
+        # External call counters for the enclosing functions (feature envy)
+        self._call_counts = []
+        # Without expression-level detectors only definitions need visiting
+        self._defs_only = not (enabled & _EXPRESSION_DETECTORS)
+    
+    def generic_visit(self, node: ast.AST):
+        """Visit children, skipping expressions when only definitions matter."""
+        if self._defs_only:
+            for child in _iter_defs(node):
+                self.visit(child)
+        else:
+            super().generic_visit(node)
+    
+    def visit_FunctionDef(self, node: ast.FunctionDef):
+        """Check function-level smells, then visit the function body."""
+        if 'long_method' in self.enabled:
+            self._check_long_method(node)
+        if 'large_parameter_list' in self.enabled:
+            self._check_large_parameter_list(node)
+        
+        if 'feature_envy' in self.enabled:
+            self._call_counts.append(0)
+            self.generic_visit(node)
+            self._check_feature_envy(node, self._call_counts.pop())
+        else:
+            self.generic_visit(node)
+    
+    def visit_ClassDef(self, node: ast.ClassDef):
+        """Check class-level smells, then visit the class body."""
+        if 'god_class' in self.enabled:
+            self._check_god_class(node)
+        self.generic_visit(node)
+    
+    def visit_Constant(self, node: ast.Constant):
+        """Check numeric literals for magic numbers."""
+        # Filter inline: this runs for every literal in the file
+        if self._check_magic_numbers:
+            value = node.value
+            value_type = type(value)
+            if (value_type is int or value_type is float) and value not in _MAGIC_NUMBER_SKIP:
+                self._report_magic_number(node)
+    
+    def visit_Expr(self, node: ast.Expr):
+        """Skip bare string expressions such as docstrings."""
+        value = node.value
+        if type(value) is ast.Constant and type(value.value) is str:
+            return
+        self.generic_visit(node)
+    
+    def visit_Call(self, node: ast.Call):
+        """Count method calls on other objects for every enclosing function."""
+        func = node.func
+        if self._call_counts and type(func) is ast.Attribute:
+            # Check if it's calling a method on another object
+            if type(func.value) is ast.Name:
+                for i in range(len(self._call_counts)):
+                    self._call_counts[i] += 1
+        self.generic_visit(node)
+    
+    def _check_long_method(self, node: ast.FunctionDef):
+        """Detect methods that are too long."""
+        max_lines = self._max_lines
+        severity = self._severities['long_method']
+        
+        method_lines = self._count_method_lines(node)
+        if method_lines > max_lines:
+            self.smells['long_method'].append(CodeSmell(
+                smell_type="Long Method",
+                file_path=self.file_path,
+                line_number=node.lineno,
+                description=f"Method '{node.name}' has {method_lines} lines (max: {max_lines})",
+                severity=severity,
+                suggestion="Consider breaking this method into smaller, more focused methods."
+            ))
+    
+    def _count_method_lines(self, method_node: ast.FunctionDef) -> int:
+        """Count the number of lines in a method."""
+        if not method_node.body:
+            return 0
+        
+        # The parser records end_lineno on every node (Python 3.8+)
+        end_line = method_node.end_lineno
+        if end_line is None:
+            end_line = max(getattr(node, 'lineno', 0) for node in ast.walk(method_node))
+        
+        return end_line - method_node.lineno + 1
+    
+    def _check_god_class(self, node: ast.ClassDef):
+        """Detect classes that are too large (God Class)."""
+        max_methods = self._max_methods
+        max_attributes = self._max_attributes
+        severity = self._severities['god_class']
+        
+        method_count = attribute_count = 0
+        for child in node.body:
+            child_type = type(child)
+            if child_type is ast.FunctionDef or child_type is ast.AsyncFunctionDef:
+                method_count += 1
+            elif child_type is ast.Assign:
+                attribute_count += 1
+        
+        if method_count > max_methods or attribute_count > max_attributes:
+            self.smells['god_class'].append(CodeSmell(
+                smell_type="God Class",
+                file_path=self.file_path,
+                line_number=node.lineno,
+                description=f"Class '{node.name}' has {method_count} methods and {attribute_count} attributes (max: {max_methods} methods, {max_attributes} attributes)",
+                severity=severity,
+                suggestion="Consider splitting this class into smaller, more focused classes."
+            ))
+    
+    def _check_large_parameter_list(self, node: ast.FunctionDef):
+        """Detect methods with too many parameters."""
+        max_parameters = self._max_parameters
+        severity = self._severities['large_parameter_list']
+        
+        param_count = len(node.args.args)
+        if param_count > max_parameters:
+            self.smells['large_parameter_list'].append(CodeSmell(
+                smell_type="Large Parameter List",
+                file_path=self.file_path,
+                line_number=node.lineno,
+                description=f"Method '{node.name}' has {param_count} parameters (max: {max_parameters})",
+                severity=severity,
+                suggestion="Consider using a parameter object or data class to group related parameters."
+            ))
+    
+    def _report_magic_number(self, node: ast.Constant):
+        """Record a numeric literal that is not a common value."""
+        self.smells['magic_numbers'].append(CodeSmell(
+            smell_type="Magic Number",
+            file_path=self.file_path,
+            line_number=node.lineno,
+            description=f"Magic number {node.value} found",
+            severity=self._severities['magic_numbers'],
+            suggestion="Replace with a named constant to improve readability."
+        ))
+    
+    def _check_feature_envy(self, node: ast.FunctionDef, external_calls: int):
+        """Detect methods that are more interested in other classes."""
+        max_external_calls = self._max_external_calls
+        severity = self._severities['feature_envy']
+        
+        if external_calls > max_external_calls:
+            self.smells['feature_envy'].append(CodeSmell(
+                smell_type="Feature Envy",
+                file_path=self.file_path,
+                line_number=node.lineno,
+                description=f"Method '{node.name}' makes {external_calls} external calls (max: {max_external_calls})",
+                severity=severity,
+                suggestion="Consider moving this method to the class it's most interested in."
+            ))
+
+
 class CodeSmellDetector:
     """Main class for detecting code smells in Python code."""
     
-    def __init__(self, config_path: Optional[str] = None):
+    def __init__(self, config_path: Optional[str] = None, use_cache: bool = True):
         """Initialize the detector with configuration."""
         self.config = self._load_config(config_path)
+        self._enabled_detectors = tuple(
+            d for d in ALL_DETECTORS if self.config.get(d, {}).get('enabled', True)
+        )
+        self.use_cache = use_cache
         self.smells = []
     
-    def _load_config(self, config_path: Optional[str]) -> Dict[str, Any]:
+    def _load_config(self, config_path: Optional[str]) -> Mapping[str, Mapping[str, Any]]:
         """Load configuration from YAML file."""
-        default_config = {
-            'long_method': {
-                'enabled': True,
-                'max_lines': 20,
-                'severity': 'high'
-            },
-            'god_class': {
-                'enabled': True,
-                'max_methods': 10,
-                'max_attributes': 15,
-                'severity': 'high'
-            },
-            'duplicated_code': {
-                'enabled': True,
-                'min_similarity': 0.8,
-                'min_lines': 5,
-                'severity': 'medium'
-            },
-            'large_parameter_list': {
-                'enabled': True,
-                'max_parameters': 5,
-                'severity': 'medium'
-            },
-            'magic_numbers': {
-                'enabled': True,
-                'severity': 'low'
-            },
-            'feature_envy': {
-                'enabled': True,
-                'max_external_calls': 3,
-                'severity': 'medium'
-            }
-        }
-        
+        mtime_ns = 0
         if config_path and os.path.exists(config_path):
-            try:
-                with open(config_path, 'r') as f:
-                    user_config = yaml.safe_load(f)
-                    # Merge user config with defaults
-                    for key, value in user_config.items():
-                        if key in default_config:
-                            default_config[key].update(value)
-            except Exception as e:
-                print(f"Warning: Could not load config file {config_path}: {e}")
-        
-        return default_config
+            mtime_ns = os.stat(config_path).st_mtime_ns
+        return _load_config_cached(config_path, mtime_ns)
     
     def detect_smells(self, file_path: str, only: Optional[List[str]] = None, 
                      exclude: Optional[List[str]] = None) -> List[CodeSmell]:
@@ -80,136 +351,211 @@ class CodeSmellDetector:
         self.smells = []
         
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                source_code = f.read()
-            
-            tree = ast.parse(source_code, filename=file_path)
+            source_bytes, tree = self._parse_file(file_path)
             
             # Determine which detectors to run
             detectors_to_run = self._get_enabled_detectors(only, exclude)
             
-            # Run each detector
+            # One AST traversal drives every node-based detector
+            visitor = _SmellVisitor(self.config, frozenset(detectors_to_run), file_path)
+            visitor.visit(tree)
+            
+            # Collect results in detector order
             for detector_name in detectors_to_run:
-                if detector_name == 'long_method':
-                    self._detect_long_methods(tree, file_path)
-                elif detector_name == 'god_class':
-                    self._detect_god_classes(tree, file_path)
-                elif detector_name == 'duplicated_code':
-                    self._detect_duplicated_code(source_code, file_path)
-                elif detector_name == 'large_parameter_list':
-                    self._detect_large_parameter_lists(tree, file_path)
-                elif detector_name == 'magic_numbers':
-                    self._detect_magic_numbers(tree, file_path)
-                elif detector_name == 'feature_envy':
-                    self._detect_feature_envy(tree, file_path)
+                if detector_name == 'duplicated_code':
+                    # Only this detector needs text; decode honoring any coding cookie
+                    self._detect_duplicated_code(decode_source(source_bytes), file_path)
+                else:
+                    self.smells.extend(visitor.smells[detector_name])
         
         except Exception as e:
             print(f"Error analyzing {file_path}: {e}")
         
         return self.smells
     
-    def _get_enabled_detectors(self, only: Optional[List[str]], 
-                              exclude: Optional[List[str]]) -> List[str]:
-        """Get list of detectors to run based on only/exclude options."""
-        all_detectors = ['long_method', 'god_class', 'duplicated_code', 
-                        'large_parameter_list', 'magic_numbers', 'feature_envy']
+    def _parse_file(self, file_path: str) -> Tuple[bytes, ast.AST]:
+        """Read and parse a file, reusing the cached tree if it is unchanged."""
+        cache_file = None
+        if self.use_cache:
+            path_hash = hashlib.blake2b(os.path.abspath(file_path).encode(), digest_size=8).hexdigest()
+            mtime_ns = os.stat(file_path).st_mtime_ns
+            cache_file = CACHE_DIR / f"{path_hash}-{mtime_ns}-{sys.implementation.cache_tag}-v{_CACHE_FORMAT}.pkl"
+            try:
+                with open(cache_file, 'rb') as f:
+                    tree, source_bytes = pickle.load(f)
+                return source_bytes, tree
+            except Exception:
+                pass
         
-        if only:
-            return [d for d in only if d in all_detectors and self.config.get(d, {}).get('enabled', True)]
+        # Bytes skip text-mode decoding; compile() handles the encoding itself
+        with open(file_path, 'rb') as f:
+            source_bytes = f.read()
         
-        enabled_detectors = [d for d in all_detectors if self.config.get(d, {}).get('enabled', True)]
+        # Plain AST only: no type comments, no inherited future flags, and no
+        # optimization, since constant folding would hide magic numbers
+        tree = compile(source_bytes, file_path, 'exec', flags=ast.PyCF_ONLY_AST, dont_inherit=True)
         
-        if exclude:
-            return [d for d in enabled_detectors if d not in exclude]
+        if cache_file is not None:
+            self._write_cache(cache_file, path_hash, (tree, source_bytes))
         
-        return enabled_detectors
+        return source_bytes, tree
     
-    def _detect_long_methods(self, tree: ast.AST, file_path: str):
-        """Detect methods that are too long."""
-        max_lines = self.config['long_method']['max_lines']
-        severity = self.config['long_method']['severity']
-        
-        for node in ast.walk(tree):
-            if isinstance(node, ast.FunctionDef):
-                # Count lines in the method
-                method_lines = self._count_method_lines(node)
-                if method_lines > max_lines:
-                    self.smells.append(CodeSmell(
-                        smell_type="Long Method",
-                        file_path=file_path,
-                        line_number=node.lineno,
-                        description=f"Method '{node.name}' has {method_lines} lines (max: {max_lines})",
-                        severity=severity,
-                        suggestion="Consider breaking this method into smaller, more focused methods."
-                    ))
+    def _write_cache(self, cache_file: Path, path_hash: str, entry: Tuple[ast.AST, bytes]):
+        """Store a parsed file in the cache, replacing stale entries for it."""
+        try:
+            CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            _prune_cache(CACHE_DIR)
+            for stale_file in CACHE_DIR.glob(f"{path_hash}-*.pkl"):
+                stale_file.unlink()
+            
+            # Write to a temporary file first so readers never see partial data
+            temp_file = cache_file.with_suffix(f".{os.getpid()}.tmp")
+            with open(temp_file, 'wb') as f:
+                pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_file, cache_file)
+        except OSError:
+            pass
     
-    def _count_method_lines(self, method_node: ast.FunctionDef) -> int:
-        """Count the number of lines in a method."""
-        if not method_node.body:
-            return 0
-        
-        # Get the line range of the method
-        start_line = method_node.lineno
-        end_line = start_line
+    def _get_enabled_detectors(self, only: Optional[List[str]], 
+                              exclude: Optional[List[str]]) -> List[str]:
+        """Get list of detectors to run based on only/exclude options."""
+        if only:
+            return [d for d in only if d in self._enabled_detectors]
         
-        for node in ast.walk(method_node):
-            if hasattr(node, 'lineno') and node.lineno > end_line:
-                end_line = node.lineno
+        if exclude:
+            excluded = frozenset(exclude)
+            return [d for d in self._enabled_detectors if d not in excluded]
         
-        return end_line - start_line + 1
-    
-    def _detect_god_classes(self, tree: ast.AST, file_path: str):
-        """Detect classes that are too large (God Class)."""
-        max_methods = self.config['god_class']['max_methods']
-        max_attributes = self.config['god_class']['max_attributes']
-        severity = self.config['god_class']['severity']
-        
-        for node in ast.walk(tree):
-            if isinstance(node, ast.ClassDef):
-                method_count = len([n for n in node.body if isinstance(n, ast.FunctionDef)])
-                attribute_count = len([n for n in node.body if isinstance(n, ast.Assign)])
-                
-                if method_count > max_methods or attribute_count > max_attributes:
-                    self.smells.append(CodeSmell(
-                        smell_type="God Class",
-                        file_path=file_path,
-                        line_number=node.lineno,
-                        description=f"Class '{node.name}' has {method_count} methods and {attribute_count} attributes (max: {max_methods} methods, {max_attributes} attributes)",
-                        severity=severity,
-                        suggestion="Consider splitting this class into smaller, more focused classes."
-                    ))
+        return list(self._enabled_detectors)
     
     def _detect_duplicated_code(self, source_code: str, file_path: str):
-        """Detect duplicated code using regex patterns."""
+        """Detect duplicated code using a rolling hash over normalized lines,
+        plus a word-similarity pass for near duplicates."""
         min_similarity = self.config['duplicated_code']['min_similarity']
         min_lines = self.config['duplicated_code']['min_lines']
         severity = self.config['duplicated_code']['severity']
         
-        lines = source_code.split('\n')
+        # A duplicate needs two non-overlapping blocks
+        if source_code.count('\n') + 1 < 2 * min_lines:
+            return
+        
+        # Normalize each line once into parallel arrays of token tuples and
+        # source line numbers; blank and comment-only lines are skipped
+        token_lines = []
+        line_numbers = []
+        line_texts = []
+        for line_number, line in enumerate(source_code.split('\n'), 1):
+            tokens = self._tokenize_line(line)
+            if tokens:
+                token_lines.append(tokens)
+                line_numbers.append(line_number)
+                line_texts.append(line.strip())
+        
+        if len(token_lines) < 2 * min_lines:
+            return
+        
+        exact_only = min_similarity >= 1.0
         
-        # Simple duplication detection by looking for repeated code blocks
-        for i in range(len(lines) - min_lines):
-            block = lines[i:i + min_lines]
-            block_text = '\n'.join(block)
+        # Without a repeated line there cannot be an exactly repeated block
+        if exact_only and len(set(token_lines)) == len(token_lines):
+            return
+        
+        # Rabin-Karp: hash every window of min_lines lines in a single pass
+        line_hashes = array('q', (hash(tokens) for tokens in token_lines))
+        window_hashes = _window_hashes(line_hashes, min_lines)
+        windows = defaultdict(list)
+        for start, window_hash in enumerate(window_hashes):
+            windows[window_hash].append(start)
+        
+        # Windows with identical text are compared once, through one group;
+        # the exact buckets already pair the windows within a group
+        group_of = []
+        groups = []
+        similar = {}
+        if not exact_only:
+            group_ids = {}
+            for start in range(len(window_hashes)):
+                text = '\n'.join(line_texts[start:start + min_lines])
+                group = group_ids.get(text)
+                if group is None:
+                    group = group_ids[text] = len(groups)
+                    groups.append([])
+                groups[group].append(start)
+                group_of.append(group)
+            similar = self._similar_windows(list(group_ids), min_similarity)
+        
+        # Report each block with its later, non-overlapping copies; a block
+        # already reported as a copy is not reported again
+        copies = set()
+        for start, window_hash in enumerate(window_hashes):
+            if start in copies:
+                continue
             
-            # Look for this block elsewhere in the code
-            occurrences = []
-            for j in range(i + min_lines, len(lines) - min_lines + 1):
-                other_block = lines[j:j + min_lines]
-                other_text = '\n'.join(other_block)
-                
-                if self._calculate_similarity(block_text, other_text) >= min_similarity:
-                    occurrences.append(j)
+            block = token_lines[start:start + min_lines]
+            matches = {
+                other for other in windows[window_hash]
+                if other >= start + min_lines and other not in copies
+                and token_lines[other:other + min_lines] == block
+            }
+            # Add later, non-overlapping windows from every similar group
+            if similar:
+                for group in similar.get(group_of[start], ()):
+                    matches.update(other for other in groups[group]
+                                   if other >= start + min_lines and other not in copies)
             
-            if occurrences:
+            if matches:
                 self.smells.append(CodeSmell(
                     smell_type="Duplicated Code",
                     file_path=file_path,
-                    line_number=i + 1,
-                    description=f"Code block starting at line {i + 1} appears {len(occurrences) + 1} times",
+                    line_number=line_numbers[start],
+                    description=f"Code block starting at line {line_numbers[start]} appears {len(matches) + 1} times",
                     severity=severity,
                     suggestion="Extract this code into a separate function to avoid duplication."
                 ))
+                copies.update(matches)
+    
+    def _similar_windows(self, window_texts: List[str],
+                         min_similarity: float) -> Dict[int, List[int]]:
+        """Map each window text to the other texts reaching min_similarity.
+        
+        Uses prefix filtering: two word sets with Jaccard similarity of at
+        least min_similarity must share one of the rarest
+        len(words) - floor(min_similarity * len(words)) + 1 words of each,
+        so only texts sharing such a word are compared.
+        """
+        word_sets = [frozenset(text.split()) for text in window_texts]
+        frequency = defaultdict(int)
+        for words in word_sets:
+            for word in words:
+                frequency[word] += 1
+        
+        index = defaultdict(list)
+        prefixes = []
+        for i, words in enumerate(word_sets):
+            prefix_length = len(words) - int(min_similarity * len(words)) + 1
+            prefix = sorted(words, key=lambda word: (frequency[word], word))[:prefix_length]
+            prefixes.append(prefix)
+            for word in prefix:
+                index[word].append(i)
+        
+        similar = defaultdict(list)
+        for i, prefix in enumerate(prefixes):
+            candidates = {j for word in prefix for j in index[word] if j > i}
+            for j in sorted(candidates):
+                if self._calculate_similarity(window_texts[i], window_texts[j]) >= min_similarity:
+                    similar[i].append(j)
+                    similar[j].append(i)
+        return similar
+    
+    def _tokenize_line(self, line: str) -> Tuple[str, ...]:
+        """Split a line into interned tokens, dropping whitespace and comments."""
+        tokens = []
+        for token in _TOKEN_RE.findall(line):
+            if token.startswith('#'):
+                break
+            # Interning lets block comparisons short-circuit on identity
+            tokens.append(sys.intern(token))
+        return tuple(tokens)
     
     def _calculate_similarity(self, text1: str, text2: str) -> float:
         """Calculate similarity between two text blocks."""
@@ -228,81 +574,15 @@ class CodeSmellDetector:
         
         return len(intersection) / len(union) if union else 0.0
     
-    def _detect_large_parameter_lists(self, tree: ast.AST, file_path: str):
-        """Detect methods with too many parameters."""
-        max_parameters = self.config['large_parameter_list']['max_parameters']
-        severity = self.config['large_parameter_list']['severity']
-        
-        for node in ast.walk(tree):
-            if isinstance(node, ast.FunctionDef):
-                param_count = len(node.args.args)
-                if param_count > max_parameters:
-                    self.smells.append(CodeSmell(
-                        smell_type="Large Parameter List",
-                        file_path=file_path,
-                        line_number=node.lineno,
-                        description=f"Method '{node.name}' has {param_count} parameters (max: {max_parameters})",
-                        severity=severity,
-                        suggestion="Consider using a parameter object or data class to group related parameters."
-                    ))
-    
-    def _detect_magic_numbers(self, tree: ast.AST, file_path: str):
-        """Detect magic numbers in the code."""
-        severity = self.config['magic_numbers']['severity']
-        
-        for node in ast.walk(tree):
-            if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)):
-                # Check if it's a magic number (not 0, 1, or common values)
-                value = node.value
-                if value not in [0, 1, -1, 2, 10, 100, 1000]:
-                    # Skip magic numbers in import statements or other safe contexts
-                    parent = getattr(node, 'parent', None)
-                    if parent and isinstance(parent, ast.Import):
-                        continue
-                    
-                    self.smells.append(CodeSmell(
-                        smell_type="Magic Number",
-                        file_path=file_path,
-                        line_number=node.lineno,
-                        description=f"Magic number {value} found",
-                        severity=severity,
-                        suggestion="Replace with a named constant to improve readability."
-                    ))
-    
-    def _detect_feature_envy(self, tree: ast.AST, file_path: str):
-        """Detect methods that are more interested in other classes."""
-        max_external_calls = self.config['feature_envy']['max_external_calls']
-        severity = self.config['feature_envy']['severity']
-        
-        for node in ast.walk(tree):
-            if isinstance(node, ast.FunctionDef):
-                external_calls = 0
-                for child in ast.walk(node):
-                    if isinstance(child, ast.Call):
-                        if isinstance(child.func, ast.Attribute):
-                            # Check if it's calling a method on another object
-                            if hasattr(child.func, 'value') and isinstance(child.func.value, ast.Name):
-                                external_calls += 1
-                
-                if external_calls > max_external_calls:
-                    self.smells.append(CodeSmell(
-                        smell_type="Feature Envy",
-                        file_path=file_path,
-                        line_number=node.lineno,
-                        description=f"Method '{node.name}' makes {external_calls} external calls (max: {max_external_calls})",
-                        severity=severity,
-                        suggestion="Consider moving this method to the class it's most interested in."
-                    ))
-    
-    def generate_report(self, output_file: Optional[str] = None) -> str:
-        """Generate a report of detected code smells."""
+    def iter_report_lines(self) -> Iterator[str]:
+        """Yield the lines of the text report one at a time."""
         if not self.smells:
-            return "No code smells detected."
+            yield "No code smells detected."
+            return
         
-        report_lines = []
-        report_lines.append("Code Smell Detection Report")
-        report_lines.append("=" * 50)
-        report_lines.append("")
+        yield "Code Smell Detection Report"
+        yield "=" * 50
+        yield ""
         
         # Group by smell type
         by_type = {}
@@ -312,18 +592,20 @@ class CodeSmellDetector:
             by_type[smell.smell_type].append(smell)
         
         for smell_type, smells in by_type.items():
-            report_lines.append(f"{smell_type} ({len(smells)} instances):")
-            report_lines.append("-" * 30)
+            yield f"{smell_type} ({len(smells)} instances):"
+            yield "-" * 30
             
             for smell in smells:
-                report_lines.append(f"  File: {smell.file_path}")
-                report_lines.append(f"  Line: {smell.line_number}")
-                report_lines.append(f"  Description: {smell.description}")
-                report_lines.append(f"  Severity: {smell.severity}")
-                report_lines.append(f"  Suggestion: {smell.suggestion}")
-                report_lines.append("")
-        
-        report_text = "\n".join(report_lines)
+                yield f"  File: {smell.file_path}"
+                yield f"  Line: {smell.line_number}"
+                yield f"  Description: {smell.description}"
+                yield f"  Severity: {smell.severity}"
+                yield f"  Suggestion: {smell.suggestion}"
+                yield ""
+    
+    def generate_report(self, output_file: Optional[str] = None) -> str:
+        """Generate a report of detected code smells."""
+        report_text = "\n".join(self.iter_report_lines())
         
         if output_file:
             with open(output_file, 'w') as f:
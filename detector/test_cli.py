@@ -0,0 +1,123 @@
+import json
+import os
+import sys
+
+import pytest
+
+from detector import cli
+from detector.smell_detector import CodeSmellDetector
+
+
+SAMPLE_SOURCE = "def price():\n    return 42\n"
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """Run in an empty directory holding one sample file."""
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "sample.py").write_text(SAMPLE_SOURCE)
+    return tmp_path
+
+
+@pytest.fixture
+def analyzed(monkeypatch):
+    """Record the files each CLI run actually analyzes."""
+    calls = []
+    detect_smells = CodeSmellDetector.detect_smells
+
+    def record(self, file_path, only=None, exclude=None):
+        calls.append(file_path)
+        return detect_smells(self, file_path, only, exclude)
+
+    monkeypatch.setattr(CodeSmellDetector, "detect_smells", record)
+    return calls
+
+
+def run_cli(monkeypatch, capsys, *args):
+    """Run the CLI incrementally over the sample file and return its report."""
+    monkeypatch.setattr(sys, "argv", ["detector", "--no-cache", "--incremental",
+                                      "--format", "json", *args, "sample.py"])
+    with pytest.raises(SystemExit):
+        cli.main()
+    return json.loads(capsys.readouterr().out)
+
+
+class TestIncremental:
+    """Test cases for reusing results with --incremental."""
+
+    def test_reuse_unchanged(self, workdir, analyzed, monkeypatch, capsys):
+        """Test an unchanged file is not analyzed again."""
+        first = run_cli(monkeypatch, capsys)
+        second = run_cli(monkeypatch, capsys)
+
+        assert analyzed == ["sample.py"]
+        assert second == first
+        assert first["total_smells"] == 1
+
+    @pytest.mark.parametrize("source,mtime_step,number", [
+        (SAMPLE_SOURCE.replace("42", "43"), 10**9, 43),  # same size, new mtime
+        (SAMPLE_SOURCE.replace("42", "420"), 0, 420),    # new size, same mtime
+    ])
+    def test_reanalyze_changed(self, workdir, analyzed, monkeypatch, capsys,
+                               source, mtime_step, number):
+        """Test a change in mtime or size triggers a new analysis."""
+        run_cli(monkeypatch, capsys)
+        path = workdir / "sample.py"
+        st = os.stat(path)
+        path.write_text(source)
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + mtime_step))
+
+        report = run_cli(monkeypatch, capsys)
+
+        assert analyzed == ["sample.py", "sample.py"]
+        assert report["smells"][0]["description"] == f"Magic number {number} found"
+
+    def test_only_invalidates(self, workdir, analyzed, monkeypatch, capsys):
+        """Test changing --only discards the stored results."""
+        run_cli(monkeypatch, capsys)
+        report = run_cli(monkeypatch, capsys, "--only", "long_method")
+
+        assert analyzed == ["sample.py", "sample.py"]
+        assert report["total_smells"] == 0
+
+    def test_config_change_invalidates(self, workdir, analyzed, monkeypatch, capsys):
+        """Test editing the config file discards the stored results."""
+        config = workdir / "config.yaml"
+        config.write_text("magic_numbers:\n  enabled: true\n")
+        run_cli(monkeypatch, capsys, "--config", "config.yaml")
+        st = os.stat(config)
+        config.write_text("magic_numbers:\n  enabled: false\n")
+        os.utime(config, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+
+        report = run_cli(monkeypatch, capsys, "--config", "config.yaml")
+
+        assert analyzed == ["sample.py", "sample.py"]
+        assert report["total_smells"] == 0
+
+    def test_corrupt_manifest_ignored(self, workdir, analyzed, monkeypatch, capsys):
+        """Test an unreadable manifest is ignored and replaced."""
+        (workdir / cli.MANIFEST_FILE).write_text("{not json")
+
+        report = run_cli(monkeypatch, capsys)
+
+        assert analyzed == ["sample.py"]
+        assert report["total_smells"] == 1
+        with open(workdir / cli.MANIFEST_FILE) as f:
+            assert "files" in json.load(f)
+
+
+class TestUnreadableFiles:
+    """Test cases for files that disappear or cannot be read."""
+
+    @pytest.mark.parametrize("flags", [[], ["--incremental"]])
+    def test_dangling_symlink(self, workdir, monkeypatch, capsys, flags):
+        """Test a dangling symlink is reported as an error and the run carries on."""
+        os.symlink(workdir / "missing.py", workdir / "broken.py")
+        monkeypatch.setattr(sys, "argv", ["detector", "--no-cache", *flags,
+                                          "--format", "json", "--output", "report.json", "."])
+        with pytest.raises(SystemExit):
+            cli.main()
+
+        assert "Error analyzing ./broken.py" in capsys.readouterr().out
+        with open(workdir / "report.json") as f:
+            assert json.load(f)["total_smells"] == 1
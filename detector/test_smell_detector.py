@@ -0,0 +1,250 @@
+import os
+import pickle
+import textwrap
+
+import pytest
+
+from detector import smell_detector
+from detector.smell_detector import CodeSmellDetector
+
+
+# Two functions that differ in a single attribute name
+NEAR_DUPLICATE_SOURCE = textwrap.dedent('''
+    def total_price(items):
+        total = 0
+        for item in items:
+            if item.available:
+                total += item.price * item.quantity
+        return total
+
+
+    def total_weight(items):
+        total = 0
+        for item in items:
+            if item.available:
+                total += item.weight * item.quantity
+        return total
+''')
+
+
+# Definitions nested in try, match, async and decorated code, with low
+# thresholds so every node-based detector fires
+NESTED_DEFS_SOURCE = textwrap.dedent('''
+    import functools
+
+
+    class Registry:
+        """Class with nested definitions in every kind of block."""
+        kind = 'registry'
+        limit = 3
+
+        @functools.lru_cache(maxsize=32)
+        def lookup(self, key, default, fallback):
+            try:
+                def on_hit(value, source, stamp):
+                    return value.strip().lower().encode()
+            except KeyError:
+                def on_miss(key, reason, stamp):
+                    log.warning(key)
+                    return default
+            return on_hit
+
+        async def fetch(self, url, timeout, retries):
+            async with session.get(url) as response:
+                return await response.json()
+
+        def route(self, command):
+            match command:
+                case 'start':
+                    def start(a, b, c):
+                        return engine.start(a, b, c) + 42
+                case _:
+                    class Handler:
+                        def handle(self, event, payload, context):
+                            return bus.send(event), bus.ack(payload), bus.log(context)
+                    return Handler
+
+
+    def outer(x):
+        def inner(a, b, c):
+            return service.call(a) + service.call(b) + service.call(c) * 7
+        return inner(x, x, x) + helper.run(x)
+''')
+
+NESTED_DEFS_CONFIG = '''\
+long_method:
+  max_lines: 3
+god_class:
+  max_methods: 2
+  max_attributes: 1
+large_parameter_list:
+  max_parameters: 2
+feature_envy:
+  max_external_calls: 2
+'''
+
+# Smells the original per-detector ast.walk passes reported for
+# NESTED_DEFS_SOURCE, except that the async method now counts towards God Class
+NESTED_DEFS_EXPECTED = [
+    ('Feature Envy', 11, "Method 'lookup' makes 3 external calls (max: 2)"),
+    ('Feature Envy', 25, "Method 'route' makes 4 external calls (max: 2)"),
+    ('Feature Envy', 32, "Method 'handle' makes 3 external calls (max: 2)"),
+    ('Feature Envy', 37, "Method 'outer' makes 4 external calls (max: 2)"),
+    ('Feature Envy', 38, "Method 'inner' makes 3 external calls (max: 2)"),
+    ('God Class', 5, "Class 'Registry' has 3 methods and 2 attributes (max: 2 methods, 1 attributes)"),
+    ('Large Parameter List', 11, "Method 'lookup' has 4 parameters (max: 2)"),
+    ('Large Parameter List', 13, "Method 'on_hit' has 3 parameters (max: 2)"),
+    ('Large Parameter List', 16, "Method 'on_miss' has 3 parameters (max: 2)"),
+    ('Large Parameter List', 28, "Method 'start' has 3 parameters (max: 2)"),
+    ('Large Parameter List', 32, "Method 'handle' has 4 parameters (max: 2)"),
+    ('Large Parameter List', 38, "Method 'inner' has 3 parameters (max: 2)"),
+    ('Long Method', 11, "Method 'lookup' has 9 lines (max: 3)"),
+    ('Long Method', 25, "Method 'route' has 10 lines (max: 3)"),
+    ('Long Method', 37, "Method 'outer' has 4 lines (max: 3)"),
+    ('Magic Number', 8, 'Magic number 3 found'),
+    ('Magic Number', 10, 'Magic number 32 found'),
+    ('Magic Number', 29, 'Magic number 42 found'),
+    ('Magic Number', 39, 'Magic number 7 found'),
+]
+
+
+@pytest.fixture
+def detect_duplicates(tmp_path):
+    """Run only the duplicated code detector over a source string."""
+    def detect(source, min_similarity=0.8):
+        config_path = tmp_path / "config.yaml"
+        config_path.write_text(f"duplicated_code:\n  min_similarity: {min_similarity}\n")
+        path = tmp_path / "sample.py"
+        path.write_text(source)
+        detector = CodeSmellDetector(str(config_path), use_cache=False)
+        return detector.detect_smells(str(path), only=['duplicated_code'])
+    return detect
+
+
+class TestDuplicatedCode:
+    """Test cases for duplicated code detection."""
+    
+    def test_exact_duplicate(self, detect_duplicates):
+        """Test an exactly repeated block is reported once at its first copy."""
+        source = NEAR_DUPLICATE_SOURCE.replace('item.weight', 'item.price')
+        smells = detect_duplicates(source, min_similarity=1.0)
+        assert [smell.line_number for smell in smells] == [3]
+        assert smells[0].description == "Code block starting at line 3 appears 2 times"
+    
+    def test_near_duplicate(self, detect_duplicates):
+        """Test blocks differing in one word are reported below 1.0 similarity."""
+        smells = detect_duplicates(NEAR_DUPLICATE_SOURCE)
+        assert [smell.line_number for smell in smells] == [3]
+    
+    def test_near_duplicate_needs_similarity(self, detect_duplicates):
+        """Test near duplicates are ignored when exact matches are required."""
+        assert detect_duplicates(NEAR_DUPLICATE_SOURCE, min_similarity=1.0) == []
+    
+    def test_repetitive_source(self, detect_duplicates):
+        """Test identical lines are reported once as a single repeated block."""
+        source = "total = compute(a, b)\n" * 200
+        assert [smell.line_number for smell in detect_duplicates(source)] == [1]
+    
+    def test_many_near_duplicates(self, detect_duplicates):
+        """Test more copies of a near-duplicate block are still all reported."""
+        source = "".join(
+            NEAR_DUPLICATE_SOURCE.replace('total_price', f'total_{i}').replace('item.price', f'item.field_{i}')
+            for i in range(20)
+        )
+        smells = detect_duplicates(source)
+        assert smells[0].description == "Code block starting at line 3 appears 40 times"
+
+
+@pytest.fixture
+def cached_detector(tmp_path, monkeypatch):
+    """Detector whose parse cache lives in a temporary directory."""
+    monkeypatch.setattr(smell_detector, "CACHE_DIR", tmp_path / "cache")
+    path = tmp_path / "sample.py"
+    path.write_text("x = 1\n")
+    return CodeSmellDetector(use_cache=True), path
+
+
+class TestParseCache:
+    """Test cases for the on-disk parse cache."""
+    
+    def test_hit(self, cached_detector, monkeypatch):
+        """Test an unchanged file is loaded from the cache without compiling."""
+        detector, path = cached_detector
+        detector._parse_file(str(path))
+        
+        def no_compile(*args, **kwargs):
+            raise AssertionError("file was parsed again")
+        monkeypatch.setattr(smell_detector, "compile", no_compile, raising=False)
+        
+        source_bytes, tree = detector._parse_file(str(path))
+        assert source_bytes == b"x = 1\n"
+        assert tree.body[0].targets[0].id == "x"
+    
+    def test_stale_entry(self, cached_detector):
+        """Test a modified file is parsed again and replaces its old entry."""
+        detector, path = cached_detector
+        detector._parse_file(str(path))
+        st = os.stat(path)
+        path.write_text("y = 2\n")
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+        
+        source_bytes, tree = detector._parse_file(str(path))
+        assert source_bytes == b"y = 2\n"
+        assert len(list(smell_detector.CACHE_DIR.glob("*.pkl"))) == 1
+    
+    def test_corrupt_entry(self, cached_detector):
+        """Test an unreadable cache entry is ignored and rewritten."""
+        detector, path = cached_detector
+        detector._parse_file(str(path))
+        cache_file, = smell_detector.CACHE_DIR.glob("*.pkl")
+        cache_file.write_bytes(b"not a pickle")
+        
+        source_bytes, tree = detector._parse_file(str(path))
+        assert source_bytes == b"x = 1\n"
+        with open(cache_file, "rb") as f:
+            assert pickle.load(f)[1] == b"x = 1\n"
+
+
+@pytest.fixture
+def detect_nested(tmp_path):
+    """Run the node-based detectors over NESTED_DEFS_SOURCE."""
+    def detect(only=None):
+        config_path = tmp_path / "config.yaml"
+        config_path.write_text(NESTED_DEFS_CONFIG)
+        path = tmp_path / "sample.py"
+        path.write_text(NESTED_DEFS_SOURCE)
+        detector = CodeSmellDetector(str(config_path), use_cache=False)
+        smells = detector.detect_smells(str(path), only=only, exclude=['duplicated_code'])
+        return sorted((smell.smell_type, smell.line_number, smell.description) for smell in smells)
+    return detect
+
+
+class TestSmellVisitor:
+    """Test cases for the single-pass detector visitor."""
+    
+    def test_nested_definitions(self, detect_nested):
+        """Test nested, decorated, try, match and async definitions are all checked."""
+        assert detect_nested() == NESTED_DEFS_EXPECTED
+    
+    def test_definitions_only(self, detect_nested):
+        """Test skipping expressions loses nothing for the definition detectors."""
+        smell_types = {"Long Method", "God Class", "Large Parameter List"}
+        only = ['long_method', 'god_class', 'large_parameter_list']
+        assert detect_nested(only) == [smell for smell in NESTED_DEFS_EXPECTED if smell[0] in smell_types]
+    
+    def test_expired_entries_pruned(self, cached_detector):
+        """Test writing an entry deletes entries older than CACHE_MAX_AGE."""
+        detector, path = cached_detector
+        cache_dir = smell_detector.CACHE_DIR
+        cache_dir.mkdir()
+        expired = cache_dir / "deleted-file.pkl"
+        recent = cache_dir / "other-file.pkl"
+        for entry, age in ((expired, smell_detector.CACHE_MAX_AGE + 60), (recent, 60)):
+            entry.write_bytes(b"")
+            mtime = entry.stat().st_mtime - age
+            os.utime(entry, (mtime, mtime))
+        
+        detector._parse_file(str(path))
+        assert not expired.exists()
+        assert recent.exists()
+        assert len(list(cache_dir.glob("*.pkl"))) == 2
@@ -1,17 +1,132 @@
 
 import json
 import datetime
+import functools
 import hashlib
+import itertools
+import logging
+import math
 import random
 import os
+import sys
+from array import array
 from typing import List, Dict, Any, Optional
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from smelly_code.validators import validate_email, validate_phone
+
+logger = logging.getLogger(__name__)
+
+# Shipping surcharges in the order calculate_shipping_cost applies them:
+# priority, express and next-day multipliers; insurance and fragile rates per
+# unit of weight; flat fees added before and after the next-day multiplier.
+_SHIPPING_MULTIPLIERS = (1.2, 1.5, 1.4)
+_SHIPPING_WEIGHT_RATES = (0.2, 0.3)
+_SHIPPING_FEES = (
+    (15, 25, 20, 10, 5, 8, 12),
+    (-5, 3, 15, 8, 5, 20),
+)
+
+
+@functools.lru_cache(maxsize=256)
+def _shipping_cost_function(multiplier_flags, weight_flags, early_flags, late_flags):
+    """Build a shipping cost function of weight and distance for one set of flags."""
+    priority, express, next_day = (
+        multiplier if flag else 1
+        for multiplier, flag in zip(_SHIPPING_MULTIPLIERS, multiplier_flags)
+    )
+    weight_rate = sum(itertools.compress(_SHIPPING_WEIGHT_RATES, weight_flags))
+    early_fees = sum(itertools.compress(_SHIPPING_FEES[0], early_flags))
+    late_fees = sum(itertools.compress(_SHIPPING_FEES[1], late_flags))
+    
+    def shipping_cost(weight, distance):
+        # Magic numbers: 0.5, 0.1
+        base_cost = (weight * 0.5 + distance * 0.1) * priority + weight * weight_rate
+        return (base_cost * express + early_fees) * next_day + late_fees
+    
+    return shipping_cost
+
+
+class ProductStore:
+    """Column-oriented product storage: numeric fields in typed arrays, the rest per row."""
+    
+    __slots__ = ('rows', 'columns', 'details')
+    
+    # Numeric fields and their array typecodes; counts stay integers
+    NUMERIC_FIELDS = (('price', 'd'), ('stock', 'q'), ('weight', 'd'), ('tax_rate', 'd'),
+                      ('discount_rate', 'd'), ('review_score', 'd'), ('popularity', 'q'))
+    
+    def __init__(self):
+        self.rows = {}
+        self.columns = {field: array(typecode) for field, typecode in self.NUMERIC_FIELDS}
+        self.details = []
+    
+    def __len__(self):
+        return len(self.details)
+    
+    def __contains__(self, product_id):
+        return product_id in self.rows
+    
+    def __iter__(self):
+        return iter(self.rows)
+    
+    def __getitem__(self, product_id):
+        """Return the product as a single dict, raising KeyError if it is unknown."""
+        product = self.get(product_id)
+        if product is None:
+            raise KeyError(product_id)
+        return product
+    
+    def add(self, product_id, numeric, details):
+        """Append a product, taking its numeric fields from the numeric mapping."""
+        # Convert every field first so a rejected value leaves the store unchanged
+        cells = tuple(array(column.typecode, (numeric[field],))
+                      for field, column in self.columns.items())
+        for column, cell in zip(self.columns.values(), cells):
+            column.extend(cell)
+        self.details.append(details)
+        self.rows[product_id] = len(self.details) - 1
+    
+    def get(self, product_id):
+        """Return the product as a single dict, or None if it is unknown."""
+        row = self.rows.get(product_id)
+        if row is None:
+            return None
+        product = dict(self.details[row])
+        for field, column in self.columns.items():
+            product[field] = column[row]
+        return product
+    
+    def rows_for(self, product_ids):
+        """Return the row of each product, raising KeyError for an unknown one."""
+        rows = self.rows
+        return [rows[product_id] for product_id in product_ids]
+    
+    def price_column(self):
+        """Return the prices as a float64 array indexed by row."""
+        return self.columns['price']
+    
+    def items(self):
+        """Yield (product_id, product) pairs in insertion order."""
+        for product_id in self.rows:
+            yield product_id, self.get(product_id)
+
 
 class ECommerceSystem:
     """E-commerce system demonstrating God Class code smell."""
     
+    __slots__ = ('products', 'users', 'orders', 'inventory', 'payments', 'shipping',
+                 'reviews', 'categories', 'discounts', 'coupons', 'analytics',
+                 'notifications', 'settings', 'logs', 'session_data', 'cache',
+                 'temp_data', '_next_product_id', '_next_order_id', '_email_service',
+                 '_inventory_service', '_analytics_service')
+    
     def __init__(self):
-        self.products = {}
+        self.products = ProductStore()
         self.users = {}
         self.orders = {}
         self.inventory = {}
@@ -28,24 +143,30 @@ class ECommerceSystem:
         self.session_data = {}
         self.cache = {}
         self.temp_data = {}
+        self._next_product_id = itertools.count(1)
+        self._next_order_id = itertools.count(1)
+        self._email_service = EmailService()
+        self._inventory_service = InventoryService()
+        self._analytics_service = AnalyticsService()
         
     def add_product(self, name, price, description, category, stock, weight, dimensions, 
                    brand, sku, tags, images, specifications, warranty, return_policy, 
                    shipping_info, tax_rate, discount_rate, review_score, popularity, 
                    related_products, variations, metadata):
         """Add product with Large Parameter List code smell (25 parameters)."""
-        product_id = len(self.products) + 1
-        self.products[product_id] = {
-            'name': name, 'price': price, 'description': description,
-            'category': category, 'stock': stock, 'weight': weight,
+        product_id = next(self._next_product_id)
+        self.products.add(product_id, {
+            'price': price, 'stock': stock, 'weight': weight,
+            'tax_rate': tax_rate, 'discount_rate': discount_rate,
+            'review_score': review_score, 'popularity': popularity
+        }, {
+            'name': name, 'description': description, 'category': category,
             'dimensions': dimensions, 'brand': brand, 'sku': sku,
             'tags': tags, 'images': images, 'specifications': specifications,
             'warranty': warranty, 'return_policy': return_policy,
-            'shipping_info': shipping_info, 'tax_rate': tax_rate,
-            'discount_rate': discount_rate, 'review_score': review_score,
-            'popularity': popularity, 'related_products': related_products,
+            'shipping_info': shipping_info, 'related_products': related_products,
             'variations': variations, 'metadata': metadata
-        }
+        })
         return product_id
     
     def process_order_workflow(self, order_data):
@@ -60,31 +181,41 @@ class ECommerceSystem:
         if not order_data.get('payment_method'):
             raise ValueError("Payment method required")
         
-        # Calculate totals
-        subtotal = 0
-        tax_amount = 0
-        shipping_cost = 0
-        discount_amount = 0
-        
+        # Look up every product before doing any arithmetic
+        product_ids = []
+        quantities = []
+        inventory_delta = {}
         for item in order_data['items']:
             product_id = item['product_id']
             quantity = item['quantity']
-            product = self.products.get(product_id)
-            
-            if not product:
-                raise ValueError(f"Product {product_id} not found")
-            
-            item_price = product['price'] * quantity
-            subtotal += item_price
+            product_ids.append(product_id)
+            quantities.append(quantity)
+            inventory_delta[product_id] = inventory_delta.get(product_id, 0) - quantity
+        try:
+            rows = self.products.rows_for(product_ids)
+        except KeyError as e:
+            raise ValueError(f"Product {e.args[0]} not found") from None
+        prices = self.products.price_column()
+        
+        # Calculate totals
+        discount_amount = 0
+        
+        if np is not None:
+            item_prices = np.frombuffer(prices)[rows] * np.array(quantities, dtype=np.float64)
+            subtotal = float(item_prices.sum())
             
-            # Calculate tax (Magic number: 0.08)
-            tax_amount += item_price * 0.08
+            # Calculate shipping (Magic numbers: 10, 0.05)
+            shipping_cost = float(np.where(item_prices > 100, 0, 10 + item_prices * 0.05).sum())
+        else:
+            item_prices = [prices[row] * quantity for row, quantity in zip(rows, quantities)]
+            subtotal = math.fsum(item_prices)
             
             # Calculate shipping (Magic numbers: 10, 0.05)
-            if item_price > 100:
-                shipping_cost += 0
-            else:
-                shipping_cost += 10 + (item_price * 0.05)
+            shipping_cost = math.fsum(0 if item_price > 100 else 10 + (item_price * 0.05)
+                                      for item_price in item_prices)
+        
+        # Calculate tax (Magic number: 0.08)
+        tax_amount = subtotal * 0.08
         
         # Apply discounts (Magic numbers: 0.1, 0.2, 0.15)
         if subtotal > 500:
@@ -98,7 +229,7 @@ class ECommerceSystem:
         total = subtotal + tax_amount + shipping_cost - discount_amount
         
         # Create order
-        order_id = len(self.orders) + 1
+        order_id = next(self._next_order_id)
         order = {
             'id': order_id,
             'customer_id': order_data['customer_id'],
@@ -119,14 +250,9 @@ class ECommerceSystem:
         if not payment_result['success']:
             raise ValueError("Payment failed")
         
-        # Update inventory
-        for item in order_data['items']:
-            product_id = item['product_id']
-            quantity = item['quantity']
-            if product_id in self.inventory:
-                self.inventory[product_id] -= quantity
-            else:
-                self.inventory[product_id] = -quantity
+        # Update inventory only once payment has gone through
+        for product_id, delta in inventory_delta.items():
+            self.inventory[product_id] = self.inventory.get(product_id, 0) + delta
         
         # Send notifications
         self.send_order_confirmation(order)
@@ -164,7 +290,7 @@ class ECommerceSystem:
     
     def send_order_confirmation(self, order):
         """Send order confirmation - Feature Envy code smell."""
-        email_service = EmailService()
+        email_service = self._email_service
         email_service.send_email(order['customer_id'], "Order Confirmation", 
                                f"Your order #{order['id']} has been confirmed")
         email_service.log_email_sent(order['customer_id'])
@@ -173,7 +299,7 @@ class ECommerceSystem:
     
     def send_inventory_alert(self):
         """Send inventory alert - Feature Envy code smell."""
-        inventory_service = InventoryService()
+        inventory_service = self._inventory_service
         inventory_service.check_low_stock()
         inventory_service.send_restock_alerts()
         inventory_service.update_supplier_notifications()
@@ -181,35 +307,19 @@ class ECommerceSystem:
     
     def send_analytics_event(self, event_type, data):
         """Send analytics event - Feature Envy code smell."""
-        analytics_service = AnalyticsService()
+        analytics_service = self._analytics_service
         analytics_service.track_event(event_type, data)
         analytics_service.update_metrics()
         analytics_service.send_to_external_api()
         analytics_service.log_performance_data()
     
     def validate_email_address(self, email):
-        """Validate email - Duplicated Code smell."""
-        if not email or '@' not in email:
-            return False
-        parts = email.split('@')
-        if len(parts) != 2:
-            return False
-        local, domain = parts
-        if not local or not domain:
-            return False
-        if '.' not in domain:
-            return False
-        return True
+        """Validate email using the shared validator."""
+        return validate_email(email)
     
     def validate_phone_number(self, phone):
-        """Validate phone - Duplicated Code smell."""
-        if not phone or len(phone) < 10:
-            return False
-        if not phone.isdigit():
-            return False
-        if len(phone) > 15:
-            return False
-        return True
+        """Validate phone using the shared validator."""
+        return validate_phone(phone)
     
     def calculate_shipping_cost(self, weight, distance, priority, insurance, 
                                fragile, express, weekend, holiday, weather, 
@@ -218,63 +328,35 @@ class ECommerceSystem:
                                driver_experience, vehicle_type, road_conditions,
                                customer_preference, special_requirements):
         """Calculate shipping with Large Parameter List (20 parameters)."""
-        # Magic numbers: 0.5, 0.1, 0.2, 0.3, 0.15, 0.25, 0.4, 0.6, 0.8, 0.9
-        base_cost = weight * 0.5 + distance * 0.1
-        if priority:
-            base_cost *= 1.2
-        if insurance:
-            base_cost += weight * 0.2
-        if fragile:
-            base_cost += weight * 0.3
-        if express:
-            base_cost *= 1.5
-        if weekend:
-            base_cost += 15
-        if holiday:
-            base_cost += 25
-        if weather == 'bad':
-            base_cost += 20
-        if traffic == 'heavy':
-            base_cost += 10
-        if fuel_surcharge:
-            base_cost += 5
-        if handling_fee:
-            base_cost += 8
-        if packaging_cost:
-            base_cost += 12
-        if delivery_time < 24:
-            base_cost *= 1.4
-        if route_optimization:
-            base_cost -= 5
-        if driver_experience > 5:
-            base_cost += 3
-        if vehicle_type == 'truck':
-            base_cost += 15
-        if road_conditions == 'poor':
-            base_cost += 8
-        if customer_preference == 'morning':
-            base_cost += 5
-        if special_requirements:
-            base_cost += 20
-        
-        return base_cost
+        shipping_cost = _shipping_cost_function(
+            (bool(priority), bool(express), delivery_time < 24),
+            (bool(insurance), bool(fragile)),
+            (bool(weekend), bool(holiday), weather == 'bad', traffic == 'heavy',
+             bool(fuel_surcharge), bool(handling_fee), bool(packaging_cost)),
+            (bool(route_optimization), driver_experience > 5, vehicle_type == 'truck',
+             road_conditions == 'poor', customer_preference == 'morning',
+             bool(special_requirements))
+        )
+        return shipping_cost(weight, distance)
 
 
 class EmailService:
     """Email service for notifications."""
     
+    __slots__ = ('sent_emails', 'email_stats')
+    
     def __init__(self):
         self.sent_emails = []
         self.email_stats = {}
     
     def send_email(self, to, subject, body):
         """Send email."""
-        print(f"Email sent to {to}: {subject}")
+        logger.debug("Email sent to %s: %s", to, subject)
         self.sent_emails.append({'to': to, 'subject': subject, 'body': body})
     
     def log_email_sent(self, to):
         """Log email."""
-        print(f"Logged email to {to}")
+        logger.debug("Logged email to %s", to)
     
     def update_customer_stats(self, customer_id):
         """Update stats."""
@@ -284,56 +366,60 @@ class EmailService:
     
     def send_sms_notification(self, phone):
         """Send SMS."""
-        print(f"SMS sent to {phone}")
+        logger.debug("SMS sent to %s", phone)
 
 
 class InventoryService:
     """Inventory management service."""
     
+    __slots__ = ('inventory', 'alerts')
+    
     def __init__(self):
         self.inventory = {}
         self.alerts = []
     
     def check_low_stock(self):
         """Check low stock."""
-        print("Checking low stock levels")
+        logger.debug("Checking low stock levels")
     
     def send_restock_alerts(self):
         """Send restock alerts."""
-        print("Sending restock alerts")
+        logger.debug("Sending restock alerts")
     
     def update_supplier_notifications(self):
         """Update supplier notifications."""
-        print("Updating supplier notifications")
+        logger.debug("Updating supplier notifications")
     
     def generate_purchase_orders(self):
         """Generate purchase orders."""
-        print("Generating purchase orders")
+        logger.debug("Generating purchase orders")
 
 
 class AnalyticsService:
     """Analytics service."""
     
+    __slots__ = ('events', 'metrics')
+    
     def __init__(self):
         self.events = []
         self.metrics = {}
     
     def track_event(self, event_type, data):
         """Track event."""
-        print(f"Tracking event: {event_type}")
+        logger.debug("Tracking event: %s", event_type)
         self.events.append({'type': event_type, 'data': data})
     
     def update_metrics(self):
         """Update metrics."""
-        print("Updating metrics")
+        logger.debug("Updating metrics")
     
     def send_to_external_api(self):
         """Send to external API."""
-        print("Sending to external API")
+        logger.debug("Sending to external API")
     
     def log_performance_data(self):
         """Log performance data."""
-        print("Logging performance data")
+        logger.debug("Logging performance data")
 
 
 def main():
@@ -371,4 +457,7 @@ def main():
 
 
 if __name__ == "__main__":
+    # Show the service notifications alongside the demo output
+    logger.addHandler(logging.StreamHandler(sys.stdout))
+    logger.setLevel(logging.DEBUG)
     main()
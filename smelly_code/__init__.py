@@ -0,0 +1 @@
+"""Sample programs with intentional code smells."""
@@ -1,14 +1,102 @@
+import logging
 import math
 import os
 import sys
-from typing import List, Dict, Any
+from collections import deque
+from functools import lru_cache
+from types import MappingProxyType
+from typing import List, Dict, Any, FrozenSet, Mapping
+
+from smelly_code.validators import validate_email, validate_phone
+
+logger = logging.getLogger(__name__)
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def _dataset_stats_kernel(values):
+    """Reduce dataset values to the sums used by process_large_dataset."""
+    count = 0
+    total = 0.0
+    max_val = -math.inf
+    min_val = math.inf
+    even_count = 0
+    positive_count = 0
+    negative_count = 0
+    sum_squares = 0.0
+    sum_cubes = 0.0
+    log_abs_sum = 0.0
+    reciprocal_sum = 0.0
+    mean = 0.0
+    m2 = 0.0
+    
+    for value in values:
+        count += 1
+        total += value
+        # Welford's update keeps the variance in the same pass
+        delta = value - mean
+        mean += delta / count
+        m2 += delta * (value - mean)
+        if value > max_val:
+            max_val = value
+        if value < min_val:
+            min_val = value
+        if value % 2 == 0:
+            even_count += 1
+        if value > 0:
+            positive_count += 1
+        elif value < 0:
+            negative_count += 1
+        sum_squares += value * value
+        sum_cubes += value * value * value
+        if value != 0:
+            log_abs_sum += math.log(abs(value))
+            reciprocal_sum += 1 / value
+    
+    variance = m2 / count if count > 0 else 0.0
+    
+    return (count, total, max_val, min_val, even_count, count - even_count,
+            positive_count, negative_count, count - positive_count - negative_count,
+            sum_squares, sum_cubes, variance, log_abs_sum, reciprocal_sum)
+
+
+@lru_cache(maxsize=None)
+def _compiled_stats_kernel():
+    """Import numba on first use and compile the dataset kernel; None without numba."""
+    # Numba is optional and slow to import, so importing this module never loads it
+    try:
+        from numba import njit
+    except ImportError:
+        return None
+    # Reassociation and FMA only; infinities are used as min/max sentinels
+    return njit(cache=True, fastmath={'reassoc', 'contract'})(_dataset_stats_kernel)
+
+
+# Every factorial that fits in an int64, looked up instead of computed
+FACTORIAL_TABLE = tuple(math.factorial(n) for n in range(21))
+
+
+# Oldest history entries are dropped once this many have been recorded
+HISTORY_LIMIT = 10000
+
+
+def _format_history_entry(entry) -> str:
+    """Render a (template, *values) history entry as text."""
+    template, *values = entry
+    return template.format(*values)
 
 
 class Calculator:
     """A calculator class that demonstrates the God Class code smell."""
     
+    __slots__ = ('history', 'user_preferences', 'cache', 'config', 'stats',
+                 'last_result')
+    
     def __init__(self):
-        self.history = []
+        self.history = deque(maxlen=HISTORY_LIMIT)
         self.user_preferences = {}
         self.cache = {}
         self.config = {}
@@ -18,21 +106,21 @@ class Calculator:
     def add(self, a: float, b: float) -> float:
         """Add two numbers."""
         result = a + b
-        self.history.append(f"add({a}, {b}) = {result}")
+        self.history.append(("add({}, {}) = {}", a, b, result))
         self.last_result = result
         return result
     
     def subtract(self, a: float, b: float) -> float:
         """Subtract two numbers."""
         result = a - b
-        self.history.append(f"subtract({a}, {b}) = {result}")
+        self.history.append(("subtract({}, {}) = {}", a, b, result))
         self.last_result = result
         return result
     
     def multiply(self, a: float, b: float) -> float:
         """Multiply two numbers."""
         result = a * b
-        self.history.append(f"multiply({a}, {b}) = {result}")
+        self.history.append(("multiply({}, {}) = {}", a, b, result))
         self.last_result = result
         return result
     
@@ -41,14 +129,14 @@ class Calculator:
         if b == 0:
             raise ValueError("Cannot divide by zero")
         result = a / b
-        self.history.append(f"divide({a}, {b}) = {result}")
+        self.history.append(("divide({}, {}) = {}", a, b, result))
         self.last_result = result
         return result
     
     def power(self, base: float, exponent: float) -> float:
         """Calculate base raised to the power of exponent."""
         result = base ** exponent
-        self.history.append(f"power({base}, {exponent}) = {result}")
+        self.history.append(("power({}, {}) = {}", base, exponent, result))
         self.last_result = result
         return result
     
@@ -57,7 +145,7 @@ class Calculator:
         if number < 0:
             raise ValueError("Cannot calculate square root of negative number")
         result = math.sqrt(number)
-        self.history.append(f"sqrt({number}) = {result}")
+        self.history.append(("sqrt({}) = {}", number, result))
         self.last_result = result
         return result
     
@@ -65,67 +153,48 @@ class Calculator:
         """Demonstrates Large Parameter List code smell."""
         # This method has too many parameters (20 parameters)
         result = (a + b + c + d + e + f + g + h + i + j + k + l + m + n + o + p + q + r + s + t) / 20
-        self.history.append(f"complex_expression result = {result}")
+        self.history.append(("complex_expression result = {}", result))
         self.last_result = result
         return result
     
     def process_large_dataset(self, data: List[Dict[str, Any]]) -> Dict[str, Any]:
         """Demonstrates Long Method code smell."""
         # This method is too long and does too many things
-        total = 0
-        count = 0
-        max_val = float('-inf')
-        min_val = float('inf')
-        even_count = 0
-        odd_count = 0
-        positive_count = 0
-        negative_count = 0
-        zero_count = 0
-        sum_squares = 0
-        sum_cubes = 0
-        geometric_mean = 1
-        harmonic_mean = 0
+        if np is not None:
+            values = np.fromiter((item['value'] for item in data if 'value' in item), dtype=np.float64)
+        else:
+            values = [item['value'] for item in data if 'value' in item]
         
-        # Process each item in the dataset
-        for item in data:
-            if 'value' in item:
-                value = item['value']
-                total += value
-                count += 1
-                
-                if value > max_val:
-                    max_val = value
-                if value < min_val:
-                    min_val = value
-                
-                if value % 2 == 0:
-                    even_count += 1
-                else:
-                    odd_count += 1
-                
-                if value > 0:
-                    positive_count += 1
-                elif value < 0:
-                    negative_count += 1
-                else:
-                    zero_count += 1
-                
-                sum_squares += value * value
-                sum_cubes += value * value * value
-                geometric_mean *= abs(value) if value != 0 else 1
-                harmonic_mean += 1 / value if value != 0 else 0
+        compiled_kernel = _compiled_stats_kernel()
+        if compiled_kernel is None and np is not None and len(values):
+            # Vectorized path: each statistic is a single C-level reduction
+            nonzero = values[values != 0]
+            count = int(values.size)
+            total = float(values.sum())
+            max_val = float(values.max())
+            min_val = float(values.min())
+            even_count = int((values % 2 == 0).sum())
+            odd_count = count - even_count
+            positive_count = int((values > 0).sum())
+            negative_count = int((values < 0).sum())
+            zero_count = count - positive_count - negative_count
+            sum_squares = float(np.square(values).sum())
+            sum_cubes = float((values ** 3).sum())
+            variance = float(values.var())
+            log_abs_sum = float(np.log(np.abs(nonzero)).sum())
+            reciprocal_sum = float(np.reciprocal(nonzero).sum())
+        else:
+            # Scalar path, compiled to native code when numba is available
+            kernel = compiled_kernel if compiled_kernel is not None else _dataset_stats_kernel
+            (count, total, max_val, min_val, even_count, odd_count,
+             positive_count, negative_count, zero_count, sum_squares, sum_cubes,
+             variance, log_abs_sum, reciprocal_sum) = kernel(values)
         
         # Calculate statistics
         mean = total / count if count > 0 else 0
-        variance = 0
-        for item in data:
-            if 'value' in item:
-                variance += (item['value'] - mean) ** 2
-        variance = variance / count if count > 0 else 0
         std_dev = math.sqrt(variance)
-        
-        geometric_mean = geometric_mean ** (1 / count) if count > 0 else 0
-        harmonic_mean = count / harmonic_mean if harmonic_mean > 0 else 0
+        geometric_mean = math.exp(log_abs_sum / count) if count > 0 else 0
+        harmonic_mean = count / reciprocal_sum if reciprocal_sum > 0 else 0
         
         # Create result dictionary
         result = {
@@ -147,29 +216,46 @@ class Calculator:
             'harmonic_mean': harmonic_mean
         }
         
-        self.history.append(f"process_large_dataset processed {count} items")
+        self.history.append(("process_large_dataset processed {} items", count))
         return result
     
     def save_to_file(self, filename: str):
         """Save calculator state to file."""
         with open(filename, 'w') as f:
-            f.write(f"Calculator History:\n")
-            for entry in self.history:
-                f.write(f"{entry}\n")
-            f.write(f"Last Result: {self.last_result}\n")
+            self._save_stream(f)
+    
+    def _save_stream(self, stream):
+        """Write calculator state to an open text stream."""
+        entries = ''.join(f"{_format_history_entry(entry)}\n" for entry in self.history)
+        stream.write(f"Calculator History:\n{entries}Last Result: {self.last_result}\n")
     
     def load_from_file(self, filename: str):
         """Load calculator state from file."""
         if os.path.exists(filename):
             with open(filename, 'r') as f:
-                lines = f.readlines()
-                for line in lines:
-                    if line.startswith("Last Result:"):
-                        self.last_result = float(line.split(":")[1].strip())
+                self._load_stream(f)
+    
+    @classmethod
+    def from_file(cls, filename: str) -> 'Calculator':
+        """Create a calculator with state loaded from file."""
+        calc = cls()
+        calc.load_from_file(filename)
+        return calc
+    
+    def _load_stream(self, stream):
+        """Read calculator state from an open text stream."""
+        for line in stream:
+            if line.startswith("Last Result:"):
+                self.last_result = float(line.split(":")[1].strip())
+                break
     
     def get_history(self) -> List[str]:
         """Get calculation history."""
-        return self.history.copy()
+        return [_format_history_entry(entry) for entry in self.history]
+    
+    def get_history_set(self) -> FrozenSet[str]:
+        """Get calculation history as a set for membership checks."""
+        return frozenset(map(_format_history_entry, self.history))
     
     def clear_history(self):
         """Clear calculation history."""
@@ -192,18 +278,25 @@ class MathUtils:
         """Calculate factorial of n."""
         if n < 0:
             raise ValueError("Factorial not defined for negative numbers")
-        if n == 0 or n == 1:
-            return 1
-        return n * MathUtils.factorial(n - 1)
+        if n < len(FACTORIAL_TABLE):
+            return FACTORIAL_TABLE[n]
+        return math.factorial(n)
     
     @staticmethod
     def fibonacci(n: int) -> int:
         """Calculate nth Fibonacci number."""
         if n < 0:
             raise ValueError("Fibonacci not defined for negative numbers")
-        if n <= 1:
-            return n
-        return MathUtils.fibonacci(n - 1) + MathUtils.fibonacci(n - 2)
+        a, b = 0, 1
+        for _ in range(n):
+            a, b = b, a + b
+        return a
+    
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def fibonacci_memo(n: int) -> int:
+        """Calculate nth Fibonacci number, caching each result."""
+        return MathUtils.fibonacci(n)
 
 
 def calculate_tax(income: float, rate: float) -> float:
@@ -219,7 +312,44 @@ def calculate_tax(income: float, rate: float) -> float:
         return income * 0.25
 
 
-def process_payment(amount: float, currency: str) -> Dict[str, Any]:
+def calculate_tax_vec(incomes):
+    """Calculate tax amounts for a batch of incomes."""
+    if np is None:
+        return [calculate_tax(income, 0) for income in incomes]
+    
+    incomes = np.asarray(incomes, dtype=np.float64)
+    # Same brackets as calculate_tax
+    return np.select(
+        [incomes < 100, incomes < 50000, incomes < 100000],
+        [0, incomes * 0.01, incomes * 0.15],
+        default=incomes * 0.25
+    )
+
+
+def process_large_dataset_np(values) -> Dict[str, Any]:
+    """Summarize an array of dataset values without per-item dicts."""
+    if np is None:
+        values = list(values)
+        return {
+            'count': len(values),
+            'total': float(sum(values)),
+            'max': max(values, default=-math.inf),
+            'min': min(values, default=math.inf)
+        }
+    
+    values = np.asarray(values, dtype=np.float64)
+    if not values.size:
+        return {'count': 0, 'total': 0.0, 'max': -math.inf, 'min': math.inf}
+    return {
+        'count': int(values.size),
+        'total': float(values.sum()),
+        'max': float(values.max()),
+        'min': float(values.min())
+    }
+
+
+@lru_cache(maxsize=1024, typed=True)
+def process_payment(amount: float, currency: str) -> Mapping[str, Any]:
     """Process payment with magic numbers."""
     # Magic numbers: 0.03, 0.5, 1000, 0.02
     processing_fee = amount * 0.03
@@ -235,47 +365,13 @@ def process_payment(amount: float, currency: str) -> Dict[str, Any]:
         discount = total_amount * 0.02
         total_amount -= discount
     
-    return {
+    # Read-only, since cached results are shared between callers
+    return MappingProxyType({
         'amount': amount,
         'processing_fee': processing_fee,
         'conversion_rate': conversion_rate,
         'total_amount': total_amount
-    }
-
-
-def validate_email(email: str) -> bool:
-    """Validate email address."""
-    # Duplicated code: email validation logic repeated
-    if not email or '@' not in email:
-        return False
-    
-    parts = email.split('@')
-    if len(parts) != 2:
-        return False
-    
-    local, domain = parts
-    if not local or not domain:
-        return False
-    
-    if '.' not in domain:
-        return False
-    
-    return True
-
-
-def validate_phone(phone: str) -> bool:
-    """Validate phone number."""
-    # Duplicated code: similar validation logic as email
-    if not phone or len(phone) < 10:
-        return False
-    
-    if not phone.isdigit():
-        return False
-    
-    if len(phone) > 15:
-        return False
-    
-    return True
+    })
 
 
 def send_notification(message: str, recipient: str):
@@ -290,18 +386,20 @@ def send_notification(message: str, recipient: str):
 class EmailService:
     """Email service class."""
     
+    __slots__ = ('sent_emails', 'email_stats')
+    
     def __init__(self):
         self.sent_emails = []
         self.email_stats = {}
     
     def send_email(self, to: str, subject: str, body: str):
         """Send email."""
-        print(f"Email sent to {to}: {subject}")
+        logger.debug("Email sent to %s: %s", to, subject)
         self.sent_emails.append({'to': to, 'subject': subject, 'body': body})
     
     def log_sent_email(self, to: str, body: str):
         """Log sent email."""
-        print(f"Logged email to {to}")
+        logger.debug("Logged email to %s", to)
     
     def update_email_stats(self, to: str):
         """Update email statistics."""
@@ -339,7 +437,7 @@ def main():
     
     # Payment processing
     payment = process_payment(500, "USD")
-    print(f"Payment processing: {payment}")
+    print(f"Payment processing: {dict(payment)}")
     
     # Validation functions
     print(f"Email validation: {validate_email('test@example.com')}")
@@ -352,4 +450,7 @@ def main():
 
 
 if __name__ == "__main__":
+    # Show the service notifications alongside the demo output
+    logger.addHandler(logging.StreamHandler(sys.stdout))
+    logger.setLevel(logging.DEBUG)
     main()
@@ -0,0 +1,34 @@
+"""Shared pytest configuration for the calculator tests."""
+
+import pytest
+
+
+def pytest_addoption(parser):
+    """Add the --no-jit option for coverage runs."""
+    parser.addoption("--no-jit", action="store_true", default=False,
+                     help="skip tests marked jit, e.g. when measuring coverage")
+
+
+def pytest_configure(config):
+    """Register the markers used by the calculator tests."""
+    config.addinivalue_line("markers", "perf: large-input tests; deselect with -m 'not perf'")
+    config.addinivalue_line("markers", "jit: tests that run Numba-compiled kernels")
+
+
+def pytest_collection_modifyitems(config, items):
+    """Skip jit-marked tests when --no-jit is given."""
+    if not config.getoption("--no-jit", default=False):
+        return
+    skip_jit = pytest.mark.skip(reason="JIT tests disabled by --no-jit")
+    for item in items:
+        if item.get_closest_marker("jit"):
+            item.add_marker(skip_jit)
+
+
+@pytest.fixture(scope="session", autouse=True)
+def _warmup_jit(request):
+    """Compile (or load from cache) the Numba kernel before the first test."""
+    if request.config.getoption("--no-jit", default=False):
+        return
+    from smelly_code.calculator import Calculator
+    Calculator().process_large_dataset([{'value': 1}])
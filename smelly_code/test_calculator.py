@@ -1,136 +1,193 @@
+import io
 import unittest
-import tempfile
-import os
-from calculator import Calculator, MathUtils, calculate_tax, process_payment, validate_email, validate_phone
 
+import pytest
+from hypothesis import given, strategies as st
 
-class TestCalculator(unittest.TestCase):
-    """Test cases for Calculator class."""
+from smelly_code import calculator
+from smelly_code.calculator import (
+    Calculator, MathUtils, calculate_tax, calculate_tax_vec, process_large_dataset_np,
+    process_payment, validate_email, validate_phone,
+)
+
+
+# Fibonacci numbers 0 through 10, indexed by n
+FIB_EXPECTED = (0, 1, 1, 2, 3, 5, 8, 13, 21, 34, 55)
+
+# process_large_dataset statistics for the values -2, 0, 1, 3 and 4
+DATASET_VALUES = (-2, 0, 1, 3, 4)
+DATASET_EXPECTED = {
+    'total': 6, 'count': 5, 'mean': 1.2, 'max': 4, 'min': -2,
+    'variance': 4.56, 'std_dev': 4.56 ** 0.5,
+    'even_count': 3, 'odd_count': 2,
+    'positive_count': 3, 'negative_count': 1, 'zero_count': 1,
+    'sum_squares': 30, 'sum_cubes': 84,
+    'geometric_mean': 24 ** 0.2, 'harmonic_mean': 5 / (-1 / 2 + 1 + 1 / 3 + 1 / 4),
+}
+DATASET_EMPTY_EXPECTED = {
+    'total': 0, 'count': 0, 'mean': 0, 'max': -float('inf'), 'min': float('inf'),
+    'variance': 0, 'std_dev': 0,
+    'even_count': 0, 'odd_count': 0,
+    'positive_count': 0, 'negative_count': 0, 'zero_count': 0,
+    'sum_squares': 0, 'sum_cubes': 0,
+    'geometric_mean': 0, 'harmonic_mean': 0,
+}
+
+
+@pytest.fixture(scope="class")
+def calc():
+    """Calculator shared by every test in a class."""
+    return Calculator()
+
+
+class TestCalculatorPure:
+    """Test cases for Calculator operations that do not inspect history."""
     
-    def setUp(self):
-        """Set up test fixtures."""
-        self.calc = Calculator()
+    @pytest.mark.parametrize("op,a,b,expected", [
+        ("add", 2, 3, 5),
+        ("subtract", 10, 4, 6),
+        ("multiply", 5, 6, 30),
+        ("divide", 15, 3, 5),
+        ("power", 2, 3, 8),
+        ("sqrt", 16, None, 4),
+    ])
+    def test_operation(self, calc, op, a, b, expected):
+        """Test each arithmetic operation and the stored last result."""
+        fn = getattr(calc, op)
+        result = fn(a) if b is None else fn(a, b)
+        assert (result, calc.last_result) == (expected, expected)
     
-    def test_add(self):
-        """Test addition operation."""
-        result = self.calc.add(2, 3)
-        self.assertEqual(result, 5)
-        self.assertEqual(self.calc.last_result, 5)
-    
-    def test_subtract(self):
-        """Test subtraction operation."""
-        result = self.calc.subtract(10, 4)
-        self.assertEqual(result, 6)
-        self.assertEqual(self.calc.last_result, 6)
-    
-    def test_multiply(self):
-        """Test multiplication operation."""
-        result = self.calc.multiply(5, 6)
-        self.assertEqual(result, 30)
-        self.assertEqual(self.calc.last_result, 30)
-    
-    def test_divide(self):
-        """Test division operation."""
-        result = self.calc.divide(15, 3)
-        self.assertEqual(result, 5)
-        self.assertEqual(self.calc.last_result, 5)
-    
-    def test_divide_by_zero(self):
+    def test_divide_by_zero(self, calc):
         """Test division by zero raises ValueError."""
-        with self.assertRaises(ValueError):
-            self.calc.divide(10, 0)
-    
-    def test_power(self):
-        """Test power operation."""
-        result = self.calc.power(2, 3)
-        self.assertEqual(result, 8)
-        self.assertEqual(self.calc.last_result, 8)
-    
-    def test_sqrt(self):
-        """Test square root operation."""
-        result = self.calc.sqrt(16)
-        self.assertEqual(result, 4)
-        self.assertEqual(self.calc.last_result, 4)
-    
-    def test_sqrt_negative(self):
+        with pytest.raises(ValueError, match="divide by zero"):
+            calc.divide(10, 0)
+    
+    def test_sqrt_negative(self, calc):
         """Test square root of negative number raises ValueError."""
-        with self.assertRaises(ValueError):
-            self.calc.sqrt(-1)
+        with pytest.raises(ValueError, match="square root of negative"):
+            calc.sqrt(-1)
     
-    def test_complex_expression(self):
+    def test_complex_expression(self, calc):
         """Test complex expression with many parameters."""
-        result = self.calc.calculate_complex_expression(1, 1, 1, 1, 1, 1, 1, 1, 1, 1,
-                                                       1, 1, 1, 1, 1, 1, 1, 1, 1, 1)
-        self.assertEqual(result, 1.0)
+        result = calc.calculate_complex_expression(1, 1, 1, 1, 1, 1, 1, 1, 1, 1,
+                                                  1, 1, 1, 1, 1, 1, 1, 1, 1, 1)
+        assert result == 1.0
     
-    def test_process_large_dataset(self):
+    @pytest.mark.jit
+    def test_process_large_dataset(self, calc):
         """Test processing large dataset."""
         data = [{'value': i} for i in range(1, 11)]
-        result = self.calc.process_large_dataset(data)
+        result = calc.process_large_dataset(data)
+        
+        assert result['count'] == 10
+        assert result['total'] == 55  # Sum of 1 to 10
+        assert result['max'] == 10
+        assert result['min'] == 1
+    
+    @pytest.mark.parametrize("path", [
+        pytest.param("numba", marks=pytest.mark.jit), "numpy", "python",
+    ])
+    @pytest.mark.parametrize("values,expected", [
+        (DATASET_VALUES, DATASET_EXPECTED),
+        ((), DATASET_EMPTY_EXPECTED),
+    ])
+    def test_process_large_dataset_paths(self, calc, monkeypatch, path, values, expected):
+        """Test every dataset statistic on the compiled, vectorized and plain paths."""
+        if path == "numba":
+            pytest.importorskip("numba")
+        else:
+            monkeypatch.setattr(calculator, "_compiled_stats_kernel", lambda: None)
+        if path == "numpy":
+            pytest.importorskip("numpy")
+        elif path == "python":
+            monkeypatch.setattr(calculator, "np", None)
+        
+        data = [{'value': value} for value in values] + [{'other': 1}]
+        result = calc.process_large_dataset(data)
+        
+        assert result == pytest.approx(expected)
+    
+    @pytest.mark.parametrize("n", [10, pytest.param(100000, marks=pytest.mark.perf)])
+    def test_process_large_dataset_np(self, n):
+        """Test array-based dataset summary."""
+        result = process_large_dataset_np(range(1, n + 1))
         
-        self.assertEqual(result['count'], 10)
-        self.assertEqual(result['total'], 55)  # Sum of 1 to 10
-        self.assertEqual(result['max'], 10)
-        self.assertEqual(result['min'], 1)
+        assert result['count'] == n
+        assert result['total'] == n * (n + 1) // 2
+        assert result['max'] == n
+        assert result['min'] == 1
+
+
+class TestCalculator:
+    """Test cases for Calculator history and persistence."""
+    
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.calc = Calculator()
     
     def test_history(self):
         """Test calculation history."""
         self.calc.add(1, 2)
         self.calc.multiply(3, 4)
         
-        history = self.calc.get_history()
-        self.assertEqual(len(history), 2)
-        self.assertIn("add(1, 2) = 3", history)
-        self.assertIn("multiply(3, 4) = 12", history)
+        assert len(self.calc.get_history()) == 2
+        history = self.calc.get_history_set()
+        assert "add(1, 2) = 3" in history
+        assert "multiply(3, 4) = 12" in history
     
     def test_clear_history(self):
         """Test clearing history."""
         self.calc.add(1, 2)
         self.calc.clear_history()
-        self.assertEqual(len(self.calc.get_history()), 0)
+        assert len(self.calc.get_history()) == 0
     
     def test_save_and_load(self):
         """Test saving and loading calculator state."""
         self.calc.add(5, 3)
         
-        with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.txt') as f:
-            temp_file = f.name
+        buf = io.StringIO()
+        self.calc._save_stream(buf)
+        buf.seek(0)
+        
+        new_calc = Calculator()
+        new_calc._load_stream(buf)
+        assert new_calc.last_result == 8
+    
+    def test_from_file(self, tmp_path):
+        """Test creating a calculator from a saved state file."""
+        self.calc.multiply(2, 4)
         
-        try:
-            self.calc.save_to_file(temp_file)
-            
-            new_calc = Calculator()
-            new_calc.load_from_file(temp_file)
-            self.assertEqual(new_calc.last_result, 8)
-        finally:
-            if os.path.exists(temp_file):
-                os.unlink(temp_file)
-
-
-class TestMathUtils(unittest.TestCase):
+        path = tmp_path / 'state.txt'
+        self.calc.save_to_file(str(path))
+        new_calc = Calculator.from_file(str(path))
+        assert new_calc.last_result == 8
+
+
+class TestMathUtils:
     """Test cases for MathUtils class."""
     
     def test_factorial(self):
         """Test factorial calculation."""
-        self.assertEqual(MathUtils.factorial(0), 1)
-        self.assertEqual(MathUtils.factorial(1), 1)
-        self.assertEqual(MathUtils.factorial(5), 120)
+        assert MathUtils.factorial(0) == 1
+        assert MathUtils.factorial(1) == 1
+        assert MathUtils.factorial(5) == 120
     
     def test_factorial_negative(self):
         """Test factorial of negative number raises ValueError."""
-        with self.assertRaises(ValueError):
+        with pytest.raises(ValueError, match="Factorial not defined for negative"):
             MathUtils.factorial(-1)
     
-    def test_fibonacci(self):
-        """Test Fibonacci calculation."""
-        self.assertEqual(MathUtils.fibonacci(0), 0)
-        self.assertEqual(MathUtils.fibonacci(1), 1)
-        self.assertEqual(MathUtils.fibonacci(5), 5)
-        self.assertEqual(MathUtils.fibonacci(10), 55)
+    @pytest.mark.parametrize("n,expected", [
+        *enumerate(FIB_EXPECTED), (20, 6765), (30, 832040),
+    ])
+    def test_fibonacci(self, n, expected):
+        """Test Fibonacci calculation and its memoized variant."""
+        assert MathUtils.fibonacci(n) == expected
+        assert MathUtils.fibonacci_memo(n) == expected
     
     def test_fibonacci_negative(self):
         """Test Fibonacci of negative number raises ValueError."""
-        with self.assertRaises(ValueError):
+        with pytest.raises(ValueError, match="Fibonacci not defined for negative"):
             MathUtils.fibonacci(-1)
 
 
@@ -151,6 +208,12 @@ class TestTaxCalculation(unittest.TestCase):
         """Test tax for high income."""
         tax = calculate_tax(75000, 0.1)
         self.assertEqual(tax, 11250)  # 75000 * 0.15
+    
+    def test_tax_vectorized(self):
+        """Test batch tax matches the scalar calculation."""
+        incomes = [50, 30000, 75000, 150000]
+        taxes = calculate_tax_vec(incomes)
+        self.assertEqual(list(taxes), [calculate_tax(income, 0.1) for income in incomes])
 
 
 class TestPaymentProcessing(unittest.TestCase):
@@ -196,7 +259,24 @@ class TestValidation(unittest.TestCase):
         self.assertFalse(validate_phone("123"))
         self.assertFalse(validate_phone("1234567890123456"))
         self.assertFalse(validate_phone("abc1234567"))
+    
+    @given(st.from_regex(r"[A-Za-z0-9._]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}", fullmatch=True))
+    def test_validate_email_generated_valid(self, email):
+        """Test generated well-formed addresses are accepted."""
+        self.assertTrue(validate_email(email))
+    
+    @given(st.text(alphabet=st.characters(blacklist_characters="@")))
+    def test_validate_email_generated_without_at(self, email):
+        """Test generated strings without an @ are rejected."""
+        self.assertFalse(validate_email(email))
+    
+    @given(st.from_regex(r"[0-9]{10,15}", fullmatch=True))
+    def test_validate_phone_generated_valid(self, phone):
+        """Test generated 10 to 15 digit numbers are accepted."""
+        self.assertTrue(validate_phone(phone))
+    
+    @given(st.text(alphabet="0123456789", max_size=9) | st.text(alphabet="0123456789", min_size=16))
+    def test_validate_phone_generated_bad_length(self, phone):
+        """Test generated digit strings of the wrong length are rejected."""
+        self.assertFalse(validate_phone(phone))
 
-
-if __name__ == '__main__':
-    unittest.main()
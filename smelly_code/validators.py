@@ -0,0 +1,28 @@
+"""Input validators shared by the sample programs."""
+
+from functools import lru_cache
+
+
+@lru_cache(maxsize=4096)
+def validate_email(email: str) -> bool:
+    """Validate email address."""
+    if not email:
+        return False
+    
+    local, sep, domain = email.rpartition('@')
+    return bool(sep) and bool(local) and '@' not in local and '.' in domain
+
+
+@lru_cache(maxsize=4096)
+def validate_phone(phone: str) -> bool:
+    """Validate phone number."""
+    if not phone or len(phone) < 10:
+        return False
+    
+    if not phone.isdigit():
+        return False
+    
+    if len(phone) > 15:
+        return False
+    
+    return True
@@ -0,0 +1,161 @@
+import itertools
+import math
+
+import pytest
+
+import sample_ecommerce
+from sample_ecommerce import ECommerceSystem
+
+
+def add_product(system, price=5.0, stock=10):
+    """Add a product that differs from the others only in price and stock."""
+    return system.add_product(
+        "Widget", price, "A widget", "Tools", stock, 1.0, "1x1x1", "Brand",
+        "W001", [], [], {}, "1 year", "30 days", "Standard", 0.08, 0.0, 4.0, 1,
+        [], {}, {}
+    )
+
+
+def reference_shipping_cost(weight, distance, priority, insurance, fragile, express,
+                            weekend, holiday, weather, traffic, fuel_surcharge,
+                            handling_fee, packaging_cost, delivery_time,
+                            route_optimization, driver_experience, vehicle_type,
+                            road_conditions, customer_preference, special_requirements):
+    """The original branch-by-branch shipping formula."""
+    base_cost = weight * 0.5 + distance * 0.1
+    if priority:
+        base_cost *= 1.2
+    if insurance:
+        base_cost += weight * 0.2
+    if fragile:
+        base_cost += weight * 0.3
+    if express:
+        base_cost *= 1.5
+    if weekend:
+        base_cost += 15
+    if holiday:
+        base_cost += 25
+    if weather == 'bad':
+        base_cost += 20
+    if traffic == 'heavy':
+        base_cost += 10
+    if fuel_surcharge:
+        base_cost += 5
+    if handling_fee:
+        base_cost += 8
+    if packaging_cost:
+        base_cost += 12
+    if delivery_time < 24:
+        base_cost *= 1.4
+    if route_optimization:
+        base_cost -= 5
+    if driver_experience > 5:
+        base_cost += 3
+    if vehicle_type == 'truck':
+        base_cost += 15
+    if road_conditions == 'poor':
+        base_cost += 8
+    if customer_preference == 'morning':
+        base_cost += 5
+    if special_requirements:
+        base_cost += 20
+    return base_cost
+
+
+# Off and on values for each shipping option after weight and distance
+SHIPPING_OPTIONS = (
+    (False, True), (False, True), (False, True), (False, True),
+    (False, True), (False, True), ('good', 'bad'), ('light', 'heavy'),
+    (0, 5), (0, 8), (0, 12), (48, 12),
+    (False, True), (2, 10), ('van', 'truck'), ('good', 'poor'),
+    ('evening', 'morning'), (None, 'liftgate'),
+)
+
+
+def place_order(system, items, payment_method='credit_card'):
+    """Run the order workflow for (product_id, quantity) pairs."""
+    return system.process_order_workflow({
+        'customer_id': 'user123',
+        'items': [{'product_id': product_id, 'quantity': quantity}
+                  for product_id, quantity in items],
+        'shipping_address': {'street': '123 Main St', 'city': 'Anytown'},
+        'payment_method': payment_method
+    })
+
+
+class TestProductStore:
+    """Test cases for the column-oriented product store."""
+
+    @pytest.mark.parametrize("price,stock", [(999.0, 2.5), (None, 10)])
+    def test_failed_add_leaves_store_unchanged(self, price, stock):
+        """Test a rejected product does not leak into the next one."""
+        system = ECommerceSystem()
+        with pytest.raises(TypeError):
+            add_product(system, price=price, stock=stock)
+
+        product_id = add_product(system, price=5.0)
+
+        assert len(system.products) == 1
+        assert list(system.products) == [product_id]
+        assert system.products[product_id]['price'] == 5.0
+        assert all(len(column) == 1 for column in system.products.columns.values())
+
+
+class TestShippingCost:
+    """Test cases for the specialized shipping cost functions."""
+
+    @pytest.mark.parametrize("weight,distance", [(0, 0), (2.5, 120), (40, 3000)])
+    def test_matches_reference(self, weight, distance):
+        """Test every combination of options against the original formula."""
+        system = ECommerceSystem()
+        for choices in itertools.product((0, 1), repeat=len(SHIPPING_OPTIONS)):
+            options = [values[choice] for values, choice in zip(SHIPPING_OPTIONS, choices)]
+            assert math.isclose(system.calculate_shipping_cost(weight, distance, *options),
+                                reference_shipping_cost(weight, distance, *options),
+                                rel_tol=1e-12, abs_tol=1e-9), options
+
+
+class TestOrderWorkflow:
+    """Test cases for order totals and inventory updates."""
+
+    @pytest.fixture
+    def system(self, monkeypatch):
+        """System with products on either side of the free-shipping threshold."""
+        monkeypatch.setattr(sample_ecommerce.random, "random", lambda: 0.5)
+        system = ECommerceSystem()
+        self.product_ids = [add_product(system, price=price) for price in (5.0, 60.0, 150.0)]
+        return system
+
+    @pytest.mark.parametrize("quantities", [(1, 0, 0), (3, 1, 0), (2, 2, 1), (0, 0, 4)])
+    def test_numpy_matches_python(self, system, monkeypatch, quantities):
+        """Test the vectorized and plain totals agree in every discount tier."""
+        pytest.importorskip("numpy")
+        items = [(product_id, quantity) for product_id, quantity
+                 in zip(self.product_ids, quantities) if quantity]
+        items.append(items[0])
+        vectorized = place_order(system, items)
+        monkeypatch.setattr(sample_ecommerce, "np", None)
+        plain = place_order(system, items)
+
+        for key in ('subtotal', 'tax', 'shipping', 'discount', 'total'):
+            assert plain[key] == pytest.approx(vectorized[key]), key
+
+    def test_inventory_updated(self, system):
+        """Test a paid order takes every item out of inventory."""
+        first, second, _ = self.product_ids
+        place_order(system, [(first, 2), (second, 1), (first, 3)])
+        assert system.inventory == {first: -5, second: -1}
+
+    def test_failed_payment_keeps_inventory(self, system, monkeypatch):
+        """Test inventory is unchanged when payment fails."""
+        monkeypatch.setattr(sample_ecommerce.random, "random", lambda: 0.0)
+        with pytest.raises(ValueError, match="Payment failed"):
+            place_order(system, [(self.product_ids[0], 2)])
+        assert system.inventory == {}
+        assert system.orders == {}
+
+    def test_unknown_product(self, system):
+        """Test an order for an unknown product is rejected by id."""
+        with pytest.raises(ValueError, match="Product 99 not found"):
+            place_order(system, [(self.product_ids[0], 1), (99, 1)])
+        assert system.inventory == {}